@@ -1,17 +1,22 @@
-from database import open_db, close_db, iterate_over_graphs_of_order, insert_graph
+from database import open_db, close_db, iterate_over_graphs_of_order, insert_graphs, update_canonical_signatures
+from graph import unpack_signature
 from tqdm import tqdm
 
 
 if __name__ == "__main__":
-    con = open_db()
+    con = open_db(wal=True)
+    print(f"Canonical signatures computed : {update_canonical_signatures(con)}")
     for i in range(2, 10):
         print(f"Order : {i}")
+        isomorphs = {}
+        for row in con.execute("SELECT signature, isomorph FROM graphs WHERE graph_order = ?", (i,)):
+            isomorph = row["isomorph"]
+            isomorphs[unpack_signature(row["signature"])] = None if isomorph is None else unpack_signature(isomorph)
         graphs = []
         for g in tqdm(iterate_over_graphs_of_order(con, i)):
             g.p4 = g.number_of_p4()
             g.property_hash = g.compute_property_hash()
             graphs.append(g)
-        for g in graphs:
-            insert_graph(con, g)
+        insert_graphs(con, ((g, isomorphs[g.signature]) for g in graphs))
 
     close_db(con)
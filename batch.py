@@ -0,0 +1,199 @@
+"""
+Propriétés d'un lot de graphes de même ordre, calculées par les noyaux vectorisés de kernels.py au lieu d'un objet
+Graph par graphe.
+
+Un GraphBatch se construit à partir d'une pile de matrices d'adjacence de forme (N, n, n) ou de N signatures sous forme
+d'entiers (voir pack_signature). Chaque propriété est un tableau de N valeurs, calculé à la première lecture puis gardé
+en cache, comme dans Graph. Les graphes non connexes sont acceptés : connected les signale, et les propriétés qui n'ont
+pas de sens pour eux (diamètre, rayon, indice de Wiener) valent -1. p3 et p4 valent -1 quand Graph donne None.
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+import kernels
+from graph import Graph, matrices_from_packed, packed_from_matrices, get_root_of_triangular_number, unpack_signature
+
+NULL = -1
+
+
+class GraphBatch(object):
+    """
+    Lot de graphes de même ordre. field(name, i) rend la valeur de la propriété name pour le graphe i sous la forme
+    donnée par Graph (booléens, entiers, None, suite des degrés en texte).
+    """
+
+    FIELDS = ("order", "size", "max_degree", "degrees", "is_tree", "is_bipartite", "is_complete",
+              "min_cycle_basis_size", "diameter", "radius", "is_eulerian", "number_of_faces", "is_regular", "p3", "p4",
+              "number_of_triangles", "wiener_index")
+
+    def __init__(self, adjs=None, signatures=None):
+        if adjs is not None and signatures is not None:
+            raise ValueError("Either signatures or arrays must be provided, not both")
+
+        if signatures is not None:
+            signatures = np.asarray(signatures, dtype=np.uint64)
+            m = int(signatures[0]).bit_length() - 1 if len(signatures) else 0
+            self.adjs = matrices_from_packed(signatures, get_root_of_triangular_number(m) + 1)
+        elif adjs is not None:
+            self.adjs = kernels.as_stack(adjs)
+        else:
+            raise ValueError("Either signatures or arrays must be provided")
+
+    @classmethod
+    def extensions(cls, parent, neighbourhoods):
+        """
+        Return the batch of the graphs obtained by adding to the connected Graph parent a vertex, numbered 0, adjacent
+        to the vertices set in each row of neighbourhoods (see kernels.bordered).
+
+        The degrees, size, distances, triangles, P3 and P4 counts are derived from the ones of parent and from the
+        neighbourhoods instead of being computed from scratch.
+        """
+        neighbourhoods = np.asarray(neighbourhoods, dtype=np.int64).reshape(-1, parent.order)
+        batch = cls(adjs=kernels.bordered(parent.adj, neighbourhoods))
+
+        degrees = np.concatenate((neighbourhoods.sum(axis=1, keepdims=True), parent.adj.sum(axis=1) + neighbourhoods),
+                                 axis=1)
+        batch.degree_sequences = np.sort(degrees, axis=1)
+        batch.size = parent.size + degrees[:, 0]
+        batch.distances = kernels.bordered_distances(parent.distances, neighbourhoods)
+        batch.number_of_triangles = parent.number_of_triangles + np.einsum("kj,ji,ki->k", neighbourhoods, parent.adj,
+                                                                           neighbourhoods) // 2
+
+        # Les P3 et P4 induits du parent le restent ; il suffit d'ajouter ceux qui contiennent le nouveau sommet.
+        for name, coverage, through_vertex in (("p3", parent._p3_coverage, kernels.p3_through),
+                                               ("p4", parent._p4_coverage, kernels.p4_coverage)):
+            count, covering = coverage
+            counts, new_covering = through_vertex(batch.adjs, 0)
+            new_covering[:, 1:, 1:] |= covering
+            covered = (new_covering == (batch.adjs == 1)).all(axis=(1, 2))
+            setattr(batch, name, np.where(covered, count + counts, NULL))
+        return batch
+
+    def __len__(self):
+        return len(self.adjs)
+
+    @cached_property
+    def signatures(self):
+        return packed_from_matrices(self.adjs)
+
+    @cached_property
+    def order(self):
+        return np.full(len(self), self.adjs.shape[1])
+
+    @cached_property
+    def degree_sequences(self):
+        return np.sort(self.adjs.sum(axis=2), axis=1)
+
+    @cached_property
+    def degrees(self):
+        return [",".join(str(d) for d in sequence) for sequence in self.degree_sequences.tolist()]
+
+    @cached_property
+    def size(self):
+        return self.adjs.sum(axis=(1, 2)) // 2
+
+    @cached_property
+    def max_degree(self):
+        return self.degree_sequences[:, -1] if self.adjs.shape[1] else np.zeros(len(self), dtype=int)
+
+    @cached_property
+    def _distance_invariants(self):
+        return kernels.invariants_of_distances(self.distances)
+
+    @cached_property
+    def distances(self):
+        return kernels.distance_matrices(self.adjs)
+
+    @cached_property
+    def connected(self):
+        return self._distance_invariants[0]
+
+    @cached_property
+    def diameter(self):
+        return self._distance_invariants[1]
+
+    @cached_property
+    def radius(self):
+        return self._distance_invariants[2]
+
+    @cached_property
+    def wiener_index(self):
+        return self._distance_invariants[3]
+
+    @cached_property
+    def is_bipartite(self):
+        # Un graphe est biparti si et seulement si aucune arête uv n'a ses extrémités à la même distance d'un sommet.
+        d = self.distances
+        same = (d[:, :, :, np.newaxis] == d[:, :, np.newaxis, :]) & (d[:, :, :, np.newaxis] >= 0)
+        return ~(same & (self.adjs[:, np.newaxis] == 1)).any(axis=(1, 2, 3))
+
+    @cached_property
+    def is_tree(self):
+        return self.connected & (self.size == self.adjs.shape[1] - 1)
+
+    @cached_property
+    def is_complete(self):
+        n = self.adjs.shape[1]
+        return self.size == n * (n - 1) // 2
+
+    @cached_property
+    def is_regular(self):
+        return (self.degree_sequences == self.degree_sequences[:, :1]).all(axis=1)
+
+    @cached_property
+    def is_eulerian(self):
+        return self.connected & (self.degree_sequences % 2 == 0).all(axis=1)
+
+    @cached_property
+    def number_of_faces(self):
+        return 2 - self.order + self.size
+
+    @cached_property
+    def min_cycle_basis_size(self):
+        return self.size - self.order + 1
+
+    @cached_property
+    def number_of_triangles(self):
+        return kernels.count_triangles(self.adjs)
+
+    @cached_property
+    def p3(self):
+        counts, covered = kernels.count_p3(self.adjs)
+        return np.where(covered, counts, NULL)
+
+    @cached_property
+    def p4(self):
+        counts, covered = kernels.count_p4(self.adjs)
+        return np.where(covered, counts, NULL)
+
+    def field(self, name, i):
+        """
+        Return the value of the property name for the graph i as Graph gives it.
+        """
+        value = getattr(self, name)[i]
+        if name in ("p3", "p4"):
+            return None if value == NULL else int(value)
+        if name == "degrees":
+            return value
+        if isinstance(value, np.bool_):
+            return bool(value)
+        return int(value)
+
+    def graph(self, i):
+        """
+        Return the Graph of the graph i, which must be connected, with the properties of FIELDS taken from the batch
+        (they are computed for the whole batch on the first call). The other properties are computed by Graph. The
+        signature comes from signatures and connectivity is not checked again.
+        """
+        g = Graph._from_connected(unpack_signature(int(self.signatures[i])), self.adjs[i])
+        for name in self.FIELDS:
+            setattr(g, name, self.field(name, i))
+        return g
+
+    def fingerprints(self):
+        """
+        Return the list of the (degrees, number_of_triangles) pairs of the graphs.
+        """
+        return list(zip(self.degrees, self.number_of_triangles.tolist()))
@@ -0,0 +1,186 @@
+"""
+Mesures de performance des chemins critiques : construction d'un Graph et calcul de chaque propriété selon l'ordre,
+génération de la base pour les ordres 5 à 8 dans une base temporaire, recherche d'isomorphes et requêtes de best_p3 /
+best_p4.
+
+Les résultats sont écrits en JSON (une mesure par entrée de la liste results) pour être comparés d'un commit à l'autre :
+    python bench.py --output bench.json
+Les graphes aléatoires sont tirés avec une graine fixe, les mesures sont donc reproductibles.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import networkx as nx
+import numpy as np
+
+from graph import Graph
+import kernels
+from database import open_db, close_db, get_isomorph, get_minimum_order_graphs, iterate_over_graphs_of_order
+from generate import extend_db_with_one_node
+
+
+def measure(function, repeat):
+    """
+    Call function repeat times and return the list of the durations, in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def measure_each(function, items):
+    """
+    Call function on each item and return the list of the durations, in seconds.
+    """
+    durations = []
+    for item in items:
+        start = time.perf_counter()
+        function(item)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def result(name, durations, **parameters):
+    return {
+        "name": name,
+        **parameters,
+        "repeat": len(durations),
+        "min": min(durations),
+        "median": float(np.median(durations)),
+        "total": sum(durations),
+    }
+
+
+def random_connected_signatures(order, count, seed):
+    rng = random.Random(seed)
+    signatures = []
+    while len(signatures) < count:
+        g = nx.gnp_random_graph(order, rng.uniform(0.2, 0.8), seed=rng.randrange(1 << 30))
+        if nx.is_connected(g):
+            signatures.append(Graph(adj=nx.to_numpy_array(g, dtype=int)).signature)
+    return signatures
+
+
+def bench_properties(orders, count, seed):
+    """
+    Time Graph construction and every property on count random connected graphs of each order. Each graph is built
+    again for each property, so the cached values of the other properties are not reused. The batch kernels are timed
+    on the whole stack of graphs.
+    """
+    results = []
+    for order in orders:
+        signatures = random_connected_signatures(order, count, seed + order)
+        durations = measure_each(lambda s: Graph(signature=s), signatures)
+        results.append(result("graph_init", durations, order=order, graphs=count))
+
+        adjs = np.array([Graph(signature=s).adj for s in signatures])
+        durations = measure(lambda: kernels.distance_invariants(adjs), 5)
+        results.append(result("batch.distance_invariants", durations, order=order, graphs=count))
+
+        for name in Graph.PROPERTIES + ("canonical_signature", "property_hash"):
+            graphs = [Graph(signature=s) for s in signatures]
+            durations = measure_each(lambda g: getattr(g, name), graphs)
+            results.append(result(f"property.{name}", durations, order=order, graphs=count))
+    return results
+
+
+def bench_generation(orders, directory):
+    """
+    Generate the database up to the last order of orders, in both generation modes, in subfolders of directory. Return
+    the results and the path of the database of the exhaustive mode, used for the query benchmarks.
+    """
+    results = []
+    cwd = os.getcwd()
+    try:
+        for canonical_augmentation in (False, True):
+            mode = "canonical_augmentation" if canonical_augmentation else "exhaustive"
+            os.makedirs(os.path.join(directory, mode))
+            os.chdir(os.path.join(directory, mode))
+            for n in range(1, max(orders)):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    durations = measure(lambda: extend_db_with_one_node(n, canonical_augmentation), 1)
+                if n + 1 in orders:
+                    results.append(result(f"generate.{mode}", durations, order=n + 1))
+    finally:
+        os.chdir(cwd)
+    return results, os.path.join(directory, "exhaustive", "graphs.db")
+
+
+def bench_queries(path, orders, count, seed):
+    con = open_db(path)
+    results = []
+    rng = random.Random(seed)
+    try:
+        for order in orders:
+            masters = list(iterate_over_graphs_of_order(con, order, masters=True))
+            # Des graphes renumérotés au hasard, pour ne pas chercher la signature du master elle-même.
+            graphs = []
+            for g in rng.sample(masters, min(count, len(masters))):
+                p = rng.sample(range(order), order)
+                graphs.append(Graph(adj=g.adj[np.ix_(p, p)]))
+            for g in graphs:
+                g.canonical_signature
+            durations = measure_each(lambda g: get_isomorph(con, g), graphs)
+            results.append(result("get_isomorph", durations, order=order, graphs=len(graphs)))
+
+        for column in ("p3", "p4"):
+            durations = measure(lambda: get_minimum_order_graphs(con, column, 1, 58), 5)
+            results.append(result(f"best_{column}", durations))
+    finally:
+        close_db(con)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "networkx": nx.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark graph properties, generation and database queries.")
+    parser.add_argument("--output", default="bench.json", help="JSON file to write, - for the standard output")
+    parser.add_argument("--orders", type=int, nargs="+", default=[5, 6, 7, 8], help="graph orders to measure")
+    parser.add_argument("--graphs", type=int, default=200, help="random graphs per order")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-generation", action="store_true", help="only measure the graph properties")
+    args = parser.parse_args()
+
+    results = bench_properties(args.orders, args.graphs, args.seed)
+    if not args.no_generation:
+        with tempfile.TemporaryDirectory() as directory:
+            generation, path = bench_generation(args.orders, directory)
+            results += generation
+            results += bench_queries(path, args.orders, args.graphs, args.seed)
+
+    report = {"environment": environment(), "parameters": vars(args), "results": results}
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=1)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    for r in results:
+        print(f"{r['name']:40} {r.get('order', ''):>3} {r['median'] * 1000:10.3f} ms (median of {r['repeat']})",
+              file=sys.stderr if args.output == "-" else sys.stdout)
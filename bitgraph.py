@@ -0,0 +1,212 @@
+"""
+Algorithmes sur les graphes représentés par leurs lignes de bits : le bit j de rows[i] vaut 1 quand i et j sont
+voisins (voir canonical.rows_from_matrix). Pour les petits ordres, un parcours en largeur se fait par des opérations
+sur des entiers, sans construire de graphe networkx.
+"""
+
+
+def _neighbourhood(rows, frontier):
+    # Union des voisinages des sommets de frontier.
+    reached = 0
+    while frontier:
+        b = frontier & -frontier
+        frontier ^= b
+        reached |= rows[b.bit_length() - 1]
+    return reached
+
+
+def bfs_layers(rows, source, mask=None):
+    """
+    Return the successive layers of a breadth-first search from source, as bitmasks, restricted to the vertices of mask
+    (all the vertices by default).
+    """
+    if mask is None:
+        mask = (1 << len(rows)) - 1
+    seen = frontier = 1 << source
+    layers = []
+    while frontier:
+        layers.append(frontier)
+        frontier = _neighbourhood(rows, frontier) & mask & ~seen
+        seen |= frontier
+    return layers
+
+
+def component(rows, source, mask=None):
+    """
+    Return the bitmask of the vertices of mask reachable from source.
+    """
+    seen = 0
+    for layer in bfs_layers(rows, source, mask):
+        seen |= layer
+    return seen
+
+
+def is_connected(rows, mask=None):
+    """
+    Return True if the subgraph induced by mask (the whole graph by default) is connected.
+    """
+    if mask is None:
+        mask = (1 << len(rows)) - 1
+    if mask == 0:
+        return True
+    source = (mask & -mask).bit_length() - 1
+    return component(rows, source, mask) == mask
+
+
+def degrees(rows):
+    return [r.bit_count() for r in rows]
+
+
+def size(rows):
+    return sum(degrees(rows)) // 2
+
+
+def distance_matrix(rows):
+    """
+    Return the matrix of the distances between the vertices of a connected graph, as a list of lists.
+    """
+    n = len(rows)
+    distances = [[0] * n for _ in range(n)]
+    for v in range(n):
+        for d, layer in enumerate(bfs_layers(rows, v)):
+            while layer:
+                b = layer & -layer
+                layer ^= b
+                distances[v][b.bit_length() - 1] = d
+    return distances
+
+
+def is_bipartite(rows):
+    # Dans chaque composante, le graphe est biparti si et seulement si aucune arête ne relie deux sommets d'une même
+    # couche du parcours en largeur.
+    remaining = (1 << len(rows)) - 1
+    while remaining:
+        source = (remaining & -remaining).bit_length() - 1
+        for layer in bfs_layers(rows, source):
+            remaining &= ~layer
+            v = layer
+            while v:
+                b = v & -v
+                v ^= b
+                if rows[b.bit_length() - 1] & layer:
+                    return False
+    return True
+
+
+def is_tree(rows):
+    return len(rows) > 0 and size(rows) == len(rows) - 1 and is_connected(rows)
+
+
+def has_bridge(rows):
+    """
+    Return True if removing some edge disconnects its component.
+    """
+    n = len(rows)
+    rows = list(rows)
+    for u in range(n):
+        for v in range(u + 1, n):
+            if not (rows[u] >> v) & 1:
+                continue
+            rows[u] ^= 1 << v
+            rows[v] ^= 1 << u
+            bridge = not (component(rows, u) >> v) & 1
+            rows[u] ^= 1 << v
+            rows[v] ^= 1 << u
+            if bridge:
+                return True
+    return False
+
+
+def is_regular(rows):
+    return len(set(degrees(rows))) <= 1
+
+
+def is_eulerian(rows):
+    return len(rows) > 0 and all(d % 2 == 0 for d in degrees(rows)) and is_connected(rows)
+
+
+def _edge_indices(rows):
+    # Numérotation des arêtes : index[u, v] est le bit de l'arête uv dans les ensembles d'arêtes.
+    index = {}
+    for u in range(len(rows)):
+        for v in range(u + 1, len(rows)):
+            if (rows[u] >> v) & 1:
+                index[u, v] = index[v, u] = len(index) // 2
+    return index
+
+
+def _shortest_path_tree(rows, root, index):
+    # Dijkstra depuis root avec le poids 2^m + 2^e pour l'arête e : les plus courts chemins pour ce poids sont des
+    # plus courts chemins du graphe, et ils sont uniques. Rend, pour chaque sommet atteint, l'ensemble des sommets et
+    # l'ensemble des arêtes de son chemin depuis root.
+    n = len(rows)
+    big = 1 << (len(index) // 2)
+    weights = [None] * n
+    vertices = [0] * n
+    edges = [0] * n
+    weights[root] = 0
+    vertices[root] = 1 << root
+    done = 0
+    while True:
+        u = min((v for v in range(n) if weights[v] is not None and not (done >> v) & 1), key=weights.__getitem__,
+                default=None)
+        if u is None:
+            return vertices, edges
+        done |= 1 << u
+        r = rows[u]
+        while r:
+            b = r & -r
+            r ^= b
+            v = b.bit_length() - 1
+            e = index[u, v]
+            w = weights[u] + big + (1 << e)
+            if weights[v] is None or w < weights[v]:
+                weights[v] = w
+                vertices[v] = vertices[u] | b
+                edges[v] = edges[u] | (1 << e)
+
+
+def minimum_cycle_basis(rows):
+    """
+    Return a minimum cycle basis of the graph, as a list of edge sets (bitmasks over the edges numbered in the order of
+    the upper triangle of the adjacency matrix).
+
+    Horton's algorithm: the cycles made of an edge xy and the shortest paths from a vertex to x and y contain a minimum
+    basis, which is extracted greedily by increasing length with a Gaussian elimination over GF(2).
+    """
+    n = len(rows)
+    index = _edge_indices(rows)
+    edge_list = [(u, v) for (u, v) in index if u < v]
+
+    candidates = set()
+    for root in range(n):
+        vertices, edges = _shortest_path_tree(rows, root, index)
+        for u, v in edge_list:
+            e = index[u, v]
+            if vertices[u] & vertices[v] != 1 << root or ((edges[u] | edges[v]) >> e) & 1:
+                continue
+            candidates.add(edges[u] | edges[v] | (1 << e))
+
+    dimension = len(edge_list) - n + sum(1 for _ in _components(rows))
+    basis = {}
+    cycles = []
+    for cycle in sorted(candidates, key=lambda c: (c.bit_count(), c)):
+        if len(cycles) == dimension:
+            break
+        c = cycle
+        while c:
+            pivot = c.bit_length() - 1
+            if pivot not in basis:
+                basis[pivot] = c
+                cycles.append(cycle)
+                break
+            c ^= basis[pivot]
+    return cycles
+
+
+def _components(rows):
+    remaining = (1 << len(rows)) - 1
+    while remaining:
+        c = component(rows, (remaining & -remaining).bit_length() - 1)
+        remaining &= ~c
+        yield c
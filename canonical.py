@@ -0,0 +1,262 @@
+"""
+Forme canonique des graphes par raffinement de partitions et individualisation (à la nauty).
+
+Deux graphes sont isomorphes si et seulement si ils ont la même signature canonique. La signature canonique a le même
+format que les signatures de graph.py : c'est la signature du graphe renuméroté selon l'étiquetage canonique.
+
+canonical_extensions implémente l'augmentation canonique de McKay : à partir d'un représentant de chaque classe
+d'isomorphisme de graphes connexes d'ordre n, on obtient chaque classe d'ordre n + 1 exactement une fois, sans
+comparer les graphes produits entre eux.
+"""
+
+import numpy as np
+from bitgraph import is_connected
+
+
+def rows_from_matrix(adj):
+    """
+    Return the adjacency matrix as a list of bitmasks, bit j of rows[i] being set when i and j are adjacent.
+    """
+    adj = np.asarray(adj, dtype=np.int64)
+    return (adj @ np.left_shift(1, np.arange(len(adj), dtype=np.int64))).tolist()
+
+
+def matrix_from_rows(rows):
+    n = len(rows)
+    return np.array([[(r >> j) & 1 for j in range(n)] for r in rows], dtype=int)
+
+
+def _refine(rows, cells):
+    # Raffine la partition ordonnée jusqu'à obtenir une partition équitable : dans chaque cellule, tous les sommets
+    # ont le même nombre de voisins dans chaque autre cellule. L'ordre des cellules ne dépend que de la structure du
+    # graphe, pas de la numérotation des sommets.
+    i = 0
+    while i < len(cells):
+        splitter = 0
+        for v in cells[i]:
+            splitter |= 1 << v
+
+        new_cells = []
+        split = False
+        for cell in cells:
+            if len(cell) == 1:
+                new_cells.append(cell)
+                continue
+            counts = {}
+            for v in cell:
+                counts.setdefault((rows[v] & splitter).bit_count(), []).append(v)
+            if len(counts) == 1:
+                new_cells.append(cell)
+            else:
+                split = True
+                for k in sorted(counts):
+                    new_cells.append(counts[k])
+
+        cells = new_cells
+        i = 0 if split else i + 1
+    return cells
+
+
+def _certificate(rows, lab):
+    # Signature (sous forme d'entier, premier bit de poids fort) du graphe renuméroté selon lab.
+    x = 0
+    n = len(lab)
+    for i in range(n - 1):
+        r = rows[lab[i]]
+        for j in range(i + 1, n):
+            x = (x << 1) | ((r >> lab[j]) & 1)
+    return x
+
+
+def _orbit_roots(n, generators):
+    parent = list(range(n))
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for gamma in generators:
+        for v in range(n):
+            a, b = find(v), find(gamma[v])
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    return [find(v) for v in range(n)]
+
+
+def automorphism_orbits(n, generators):
+    """
+    Return the orbits of the group spanned by generators as a list of sorted vertex lists.
+    """
+    orbits = {}
+    for v, root in enumerate(_orbit_roots(n, generators)):
+        orbits.setdefault(root, []).append(v)
+    return list(orbits.values())
+
+
+def canonical_labelling(rows):
+    """
+    Return (lab, cert, generators) for the graph given by its bitmask rows.
+
+    lab[i] is the vertex placed at position i by the canonical labelling, cert is the canonical signature as an integer
+    and generators is a list of permutations spanning the automorphism group of the graph.
+    """
+    n = len(rows)
+    if n == 0:
+        return [], 0, []
+
+    first = {}
+    best = {}
+    generators = []
+
+    def search(cells, prefix):
+        cells = _refine(rows, cells)
+        target = next((k for k, c in enumerate(cells) if len(c) > 1), None)
+
+        if target is None:
+            lab = [c[0] for c in cells]
+            cert = _certificate(rows, lab)
+            if not first:
+                first.update(lab=lab, cert=cert, path=prefix)
+                best.update(lab=lab, cert=cert)
+                return None
+            if cert == first["cert"]:
+                gamma = [0] * n
+                for a, b in zip(first["lab"], lab):
+                    gamma[a] = b
+                generators.append(gamma)
+                # Le sous-arbre courant est l'image d'un sous-arbre déjà exploré : on remonte jusqu'au point de
+                # divergence avec le premier chemin.
+                return next(k for k, (a, b) in enumerate(zip(first["path"], prefix)) if a != b)
+            if cert > best["cert"]:
+                best.update(lab=lab, cert=cert)
+            elif cert == best["cert"]:
+                gamma = [0] * n
+                for a, b in zip(best["lab"], lab):
+                    gamma[a] = b
+                generators.append(gamma)
+            return None
+
+        cell = cells[target]
+        explored = []
+        for v in sorted(cell):
+            if explored:
+                # Élagage par les automorphismes connus qui fixent les sommets déjà individualisés.
+                stabilizer = [gamma for gamma in generators if all(gamma[u] == u for u in prefix)]
+                roots = _orbit_roots(n, stabilizer)
+                if any(roots[v] == roots[u] for u in explored):
+                    continue
+            explored.append(v)
+            new_cells = cells[:target] + [[v], [u for u in cell if u != v]] + cells[target + 1:]
+            r = search(new_cells, prefix + [v])
+            if r is not None and r < len(prefix):
+                return r
+        return None
+
+    search([list(range(n))], [])
+    return best["lab"], best["cert"], generators
+
+
+def certificate_to_signature(cert, n):
+    m = n * (n - 1) // 2
+    return format(cert, f"0{m}b") if m else ""
+
+
+def canonical_signature(adj):
+    """
+    Return the canonical signature of the graph with adjacency matrix adj. Two graphs are isomorphic if and only if
+    they have the same canonical signature.
+    """
+    rows = rows_from_matrix(adj)
+    _, cert, _ = canonical_labelling(rows)
+    return certificate_to_signature(cert, len(rows))
+
+
+def _connected_without(rows, v):
+    # Le graphe privé du sommet v est-il connexe ?
+    return is_connected(rows, ((1 << len(rows)) - 1) & ~(1 << v))
+
+
+def _subset_orbit_representatives(n, generators):
+    # Un sous-ensemble non vide de sommets par orbite du groupe d'automorphismes.
+    seen = set()
+    for s in range(1, 1 << n):
+        if s in seen:
+            continue
+        yield s
+        seen.add(s)
+        stack = [s]
+        while stack:
+            t = stack.pop()
+            for gamma in generators:
+                image = 0
+                for i in range(n):
+                    if (t >> i) & 1:
+                        image |= 1 << gamma[i]
+                if image not in seen:
+                    seen.add(image)
+                    stack.append(image)
+
+
+def _neighbour_degrees(rows, degrees, v):
+    r = rows[v]
+    return sorted(degrees[u] for u in range(len(rows)) if (r >> u) & 1)
+
+
+def _is_canonical_extension(rows):
+    # Le sommet ajouté (0) doit être dans l'orbite du sommet de suppression canonique : parmi les sommets qui ne
+    # déconnectent pas le graphe, ceux de plus grand invariant (degré, degrés des voisins), puis le dernier dans
+    # l'étiquetage canonique.
+    degrees = [r.bit_count() for r in rows]
+    key = None
+    ties = [0]
+    for v in range(1, len(rows)):
+        if degrees[v] < degrees[0]:
+            continue
+        if degrees[v] == degrees[0]:
+            if key is None:
+                key = _neighbour_degrees(rows, degrees, 0)
+            kv = _neighbour_degrees(rows, degrees, v)
+            if kv < key:
+                continue
+            larger = kv > key
+        else:
+            larger = True
+        if not _connected_without(rows, v):
+            continue
+        if larger:
+            return False
+        ties.append(v)
+
+    if len(ties) == 1:
+        return True
+
+    lab, _, generators = canonical_labelling(rows)
+    position = {v: i for i, v in enumerate(lab)}
+    w = max(ties, key=position.__getitem__)
+    roots = _orbit_roots(len(rows), generators)
+    return roots[w] == roots[0]
+
+
+def canonical_extensions(rows, stats=None):
+    """
+    Yield the bitmask rows of the graphs of order n + 1 obtained by adding a vertex (numbered 0) to the connected graph
+    given by rows, keeping only the ones whose canonical parent is this graph.
+
+    When called on one representative of every isomorphism class of connected graphs of order n, every isomorphism
+    class of connected graphs of order n + 1 is yielded exactly once.
+
+    When stats, a Counter, is given, the neighbourhoods tried (one per orbit of subsets) are counted as "candidates"
+    and the ones rejected as "not canonical".
+    """
+    _, _, generators = canonical_labelling(rows)
+    for s in _subset_orbit_representatives(len(rows), generators):
+        child = [s << 1] + [(r << 1) | ((s >> i) & 1) for i, r in enumerate(rows)]
+        if stats is not None:
+            stats["candidates"] += 1
+        if _is_canonical_extension(child):
+            yield child
+        elif stats is not None:
+            stats["not canonical"] += 1
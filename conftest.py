@@ -0,0 +1,50 @@
+"""
+Fixtures partagées des tests : les masters des ordres 2 à MAX_ORDER, générés une fois par session dans un dossier
+temporaire, par augmentation canonique et par extension exhaustive.
+"""
+
+import os
+
+import pytest
+
+from database import open_db, close_db, iterate_over_graphs_of_order
+from generate import extend_db_with_one_node
+
+MAX_ORDER = 7
+
+
+def generate(folder, canonical_augmentation, max_order=MAX_ORDER):
+    """
+    Generate the graphs of order max_order at most in folder/graphs.db and return the path of the database.
+    """
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        for n in range(1, max_order):
+            extend_db_with_one_node(n, canonical_augmentation)
+    finally:
+        os.chdir(cwd)
+    return os.path.join(folder, "graphs.db")
+
+
+def masters_by_order(path, max_order=MAX_ORDER):
+    con = open_db(path)
+    try:
+        return {n: list(iterate_over_graphs_of_order(con, n, masters=True)) for n in range(2, max_order + 1)}
+    finally:
+        close_db(con)
+
+
+@pytest.fixture(scope="session")
+def masters(tmp_path_factory):
+    return masters_by_order(generate(tmp_path_factory.mktemp("augmentation"), True))
+
+
+@pytest.fixture(scope="session")
+def exhaustive_masters(tmp_path_factory):
+    return masters_by_order(generate(tmp_path_factory.mktemp("exhaustive"), False))
+
+
+@pytest.fixture(scope="session")
+def all_masters(masters):
+    return [g for n in sorted(masters) for g in masters[n]]
@@ -3,15 +3,51 @@ Dans la base de données, on stocke les graphs et leur propriétés.
 La clef d'un graphe est sa signature, les valeurs supérieures de la matrice d'adjacence. Idéalement, on ne stocke
 qu'un représentant pour chaque graphe isomorphe, le master. Si on ajoute un graphe isomorphe, on le lie au master par la
 colonne isomorph.
+La colonne canonical_signature contient la signature canonique du graphe (voir canonical.py) : deux graphes sont
+isomorphes si et seulement si ils ont la même signature canonique, ce qui permet de retrouver le master par une simple
+recherche dans la table masters.
+Les signatures (signature, isomorph, canonical_signature) sont stockées sous forme d'entiers, voir pack_signature
+dans graph.py ; la colonne signature est alors la clef primaire entière de SQLite (rowid). Les fonctions de ce module
+prennent et rendent des signatures sous forme de texte.
+La table extended contient les graphes dont tous les fils ont été insérés : une génération interrompue reprend avec les
+graphes qui n'y sont pas.
+La table masters associe à chaque signature canonique la signature de son master, et la table aliases associe aux
+graphes stockés qui ne sont pas des masters la signature de leur master. La recherche d'un isomorphe ne lit que la
+table masters, une clef entière par classe d'isomorphisme, quelle que soit la taille de la table graphs. Les fonctions
+d'insertion de ce module tiennent ces deux tables à jour. Si plusieurs masters ont la même signature canonique, la
+table masters garde celui de plus petite signature, quel que soit l'ordre des insertions.
+Pendant une génération, les lignes sont écrites par un RowWriter : un thread qui a sa propre connexion et écrit pendant
+que le programme calcule les graphes suivants.
 """
 
+import queue
 import sqlite3
-from graph import Graph, GraphIsNotConnectedError
+import threading
+from collections import OrderedDict
+import profiling
+from graph import Graph, GraphIsNotConnectedError, matrix_from_signature, pack_signature, unpack_signature, \
+    matrices_from_packed
+from canonical import canonical_signature
 
 
-def open_db():
-    con = sqlite3.connect("graphs.db")
+BATCH_SIZE = 10000
+CHUNK_SIZE = 10000
+MASTER_CACHE_SIZE = 200000
+
+
+def open_db(path="graphs.db", wal=False):
+    """
+    Open the database. With wal, the database is switched to write-ahead logging and the connection to settings suited
+    to bulk loading: commits no longer wait for the data to reach the disk, which only loses the last transactions (never
+    corrupts the database) on a power failure.
+    """
+    con = sqlite3.connect(path, factory=profiling.connection_factory())
     con.row_factory = sqlite3.Row
+    if wal:
+        con.execute("PRAGMA journal_mode = WAL")
+        con.execute("PRAGMA synchronous = NORMAL")
+        con.execute("PRAGMA temp_store = MEMORY")
+        con.execute("PRAGMA cache_size = -262144")
     create_table(con)
     return con
 
@@ -20,49 +56,148 @@ def close_db(con):
     con.close()
 
 
-def iterate_over_graphs_of_order(con, n):
+def database_path(con):
+    return con.execute("PRAGMA database_list").fetchone()["file"]
+
+
+def signature_range(n):
+    """
+    Return the bounds (low, high) of the packed signatures of the graphs of order n: low <= signature < high.
+    """
+    m = n * (n - 1) // 2
+    return 1 << m, 1 << (m + 1)
+
+
+def iterate_over_rows_of_order(con, n, masters=False, chunk_size=CHUNK_SIZE, skip_extended=False):
+    """
+    Yield the rows of the graphs of order n, sorted by signature. The rows are read chunk_size at a time, each chunk
+    starting after the last signature of the previous one, so memory does not depend on the number of graphs and the
+    database can be written between two chunks. With skip_extended, the graphs recorded in the extended table are
+    left out.
+    """
+    last, high = signature_range(n)
+    last -= 1
+    SQL = "SELECT * FROM graphs WHERE signature > ? and signature < ?"
+    if masters:
+        SQL += " and isomorph = signature"
+    if skip_extended:
+        SQL += " and signature NOT IN (SELECT parent FROM extended)"
+    SQL += " ORDER BY signature LIMIT ?"
+
     cur = con.cursor()
-    graphs = cur.execute("SELECT * FROM graphs WHERE graph_order = ?", (n,))
-    rows = cur.fetchall()
-    for row in rows:
-        yield Graph(signature=row["signature"], adj=None, row=row)
+    while True:
+        rows = cur.execute(SQL, (last, high, chunk_size)).fetchall()
+        if len(rows) == 0:
+            return
+        yield from rows
+        last = rows[-1]["signature"]
+
+
+def iterate_over_graphs_of_order(con, n, masters=False, chunk_size=CHUNK_SIZE, skip_extended=False):
+    for row in iterate_over_rows_of_order(con, n, masters, chunk_size, skip_extended):
+        yield Graph(signature=unpack_signature(row["signature"]), adj=None, row=row)
+
+
+def iterate_over_adjacency_of_order(con, n, masters=False, chunk_size=CHUNK_SIZE):
+    """
+    Yield (signatures, adjacency) pairs for the graphs of order n, chunk_size graphs at a time: signatures is the array
+    of packed signatures and adjacency the stack of adjacency matrices of shape (len(signatures), n, n).
+    """
+    last, high = signature_range(n)
+    last -= 1
+    SQL = "SELECT signature FROM graphs WHERE signature > ? and signature < ?"
+    if masters:
+        SQL += " and isomorph = signature"
+    SQL += " ORDER BY signature LIMIT ?"
+
+    cur = con.cursor()
+    while True:
+        signatures = [row[0] for row in cur.execute(SQL, (last, high, chunk_size))]
+        if len(signatures) == 0:
+            return
+        yield signatures, matrices_from_packed(signatures, n)
+        last = signatures[-1]
 
 
 def get_isomorph(con, g):
     """
     Return the master graph isomorph with g. The master graph is representative of isomorphic graphs.
-    In the database, the master graph is the one with the isomoprh column associated to itself.
+    In the database, the master graph is the one with the isomoprh column associated to itself; it is found in the
+    masters table by the canonical signature of g.
     """
-    cur = con.cursor()
-    graphs = cur.execute("SELECT * FROM graphs WHERE property_hash = ? and isomorph = signature", (g.property_hash,))
     if g is None:
         return None
+
+    cur = con.cursor()
+    cur.execute("SELECT signature FROM masters WHERE canonical_signature = ?", (pack_signature(g.canonical_signature),))
+    row = cur.fetchone()
+    if row is None:
+        return None
     else:
-        rows = cur.fetchall()
-        if len(rows) == 0:
-            return None
-        else:
-            for row in rows:
-                o = Graph(signature=row["signature"], adj=None, row=row)
-                if g.isomorph_with(o):
-                    return o.signature
+        return unpack_signature(row["signature"])
 
-            return None
 
+class MasterCache(object):
+    """
+    Cache LRU des masters, pour les recherches d'isomorphes répétées pendant une génération : la clef est la signature
+    canonique et la valeur la signature du master, toutes deux sous forme d'entiers. Au plus maxsize masters sont
+    gardés, les moins récemment utilisés sont oubliés. Un graphe absent du cache est cherché dans la base ; les masters
+    insérés pendant la génération doivent être ajoutés avec add pour que le cache reste cohérent avec la base.
+    Quand les lignes sont écrites par un RowWriter, pending est son dictionnaire des masters pas encore validés, consulté
+    avant la base.
+    """
 
-def insert_graph(con, g, isomorph=None):
-    if g.is_connected() is False:
-        raise GraphIsNotConnectedError("Graph is not connected")
+    def __init__(self, con, maxsize=MASTER_CACHE_SIZE, pending=None):
+        self.con = con
+        self.maxsize = maxsize
+        self.pending = {} if pending is None else pending
+        self.masters = OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
-    cur = con.cursor()
-    SQL = """INSERT OR REPLACE INTO graphs (signature, property_hash, graph_order, graph_size, isomorph, max_degree, degrees, is_tree, is_bipartite, has_bridge, is_chordal, is_complete, min_cycle_basis_weight, min_cycle_basis_size, diameter, radius, is_eulerian, is_planar, number_of_faces, is_regular, p3, p4)
-                VALUES (:signature, :property_hash, :graph_order,:graph_size, :isomorph, :max_degree, :degrees, :is_tree, :is_bipartite, :has_bridge, :is_chordal, :is_complete, :min_cycle_basis_weight, :min_cycle_basis_size, :diameter, :radius, :is_eulerian, :is_planar, :number_of_faces, :is_regular, :p3, :p4)"""
-    dict = {
-        'signature': "".join(str(i) for i in g.signature),
+    def get_isomorph(self, g):
+        """
+        Same as get_isomorph(con, g), answered from memory when the master is cached.
+        """
+        key = pack_signature(g.canonical_signature)
+        master = self.masters.get(key)
+        if master is not None:
+            self.masters.move_to_end(key)
+            self.hits += 1
+            return unpack_signature(master)
+
+        self.misses += 1
+        master = self.pending.get(key)
+        signature = get_isomorph(self.con, g) if master is None else unpack_signature(master)
+        if signature is not None:
+            self.add(g.canonical_signature, signature)
+        return signature
+
+    def add(self, canonical, signature):
+        """
+        Record signature as the master of the graphs of canonical signature canonical.
+        """
+        key = pack_signature(canonical)
+        self.masters[key] = pack_signature(signature)
+        self.masters.move_to_end(key)
+        if len(self.masters) > self.maxsize:
+            self.masters.popitem(last=False)
+
+
+INSERT_SQL = """INSERT OR REPLACE INTO graphs (signature, property_hash, graph_order, graph_size, isomorph, max_degree, degrees, is_tree, is_bipartite, has_bridge, is_chordal, is_complete, min_cycle_basis_weight, min_cycle_basis_size, diameter, radius, is_eulerian, is_planar, number_of_faces, is_regular, p3, p4, canonical_signature)
+                VALUES (:signature, :property_hash, :graph_order,:graph_size, :isomorph, :max_degree, :degrees, :is_tree, :is_bipartite, :has_bridge, :is_chordal, :is_complete, :min_cycle_basis_weight, :min_cycle_basis_size, :diameter, :radius, :is_eulerian, :is_planar, :number_of_faces, :is_regular, :p3, :p4, :canonical_signature)"""
+
+
+def graph_to_row(g, isomorph=None):
+    """
+    Return the values inserted in the graphs table for g.
+    """
+    return {
+        'signature': pack_signature(g.signature),
         'property_hash': g.property_hash,
         'graph_order': g.order,
         'graph_size': g.size,
-        'isomorph': isomorph,
+        'isomorph': None if isomorph is None else pack_signature(isomorph),
         "max_degree": g.max_degree,
         "degrees": g.degrees,
         "is_tree": g.is_tree,
@@ -79,37 +214,284 @@ def insert_graph(con, g, isomorph=None):
         "number_of_faces": g.number_of_faces,
         "is_regular": g.is_regular,
         "p3": g.p3,
-        "p4": g.p4
+        "p4": g.p4,
+        "canonical_signature": pack_signature(g.canonical_signature)
     }
-    con.execute(SQL, dict)
+
+
+def get_master_signatures(con, n, skip_extended=False):
+    """
+    Return the signatures of the master graphs of order n, sorted. With skip_extended, the graphs recorded in the
+    extended table are left out.
+    """
+    SQL = "SELECT signature FROM graphs WHERE signature >= ? and signature < ? and isomorph = signature"
+    if skip_extended:
+        SQL += " and signature NOT IN (SELECT parent FROM extended)"
+    cur = con.cursor()
+    cur.execute(SQL + " ORDER BY signature", signature_range(n))
+    return [unpack_signature(row["signature"]) for row in cur.fetchall()]
+
+
+def get_known_canonical_signatures(con, canonical_signatures):
+    """
+    Return the subset of canonical_signatures (packed, as in graph_to_row) of the masters already in the database.
+    """
+    canonical_signatures = list(canonical_signatures)
+    known = set()
+    cur = con.cursor()
+    for i in range(0, len(canonical_signatures), 500):
+        chunk = canonical_signatures[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cur.execute(f"SELECT canonical_signature FROM masters WHERE canonical_signature IN ({placeholders})", chunk)
+        known.update(row["canonical_signature"] for row in cur.fetchall())
+    return known
+
+
+# Le master d'une classe déjà indexée n'est remplacé que par un master de plus petite signature, comme dans
+# index_masters.
+MASTER_SQL = """INSERT INTO masters (canonical_signature, signature) VALUES (:canonical_signature, :signature)
+                ON CONFLICT (canonical_signature) DO UPDATE SET signature = excluded.signature
+                WHERE excluded.signature < masters.signature"""
+
+
+def index_rows(con, rows):
+    """
+    Record the rows built by graph_to_row in the masters table, when the graph is its own isomorph, or in the aliases
+    table, when it is linked to another master (a graph without isomorph is in neither). A graph stored again with
+    another isomorph is removed from the table it was in.
+    """
+    masters = [row for row in rows if row["isomorph"] == row["signature"]]
+    aliases = [row for row in rows if row["isomorph"] != row["signature"]]
+    if masters:
+        con.executemany("DELETE FROM aliases WHERE signature = :signature", masters)
+        con.executemany(MASTER_SQL, masters)
+    if aliases:
+        con.executemany("DELETE FROM masters WHERE signature = :signature", aliases)
+        con.executemany("DELETE FROM aliases WHERE signature = :signature", aliases)
+        con.executemany("INSERT INTO aliases (signature, master) VALUES (:signature, :isomorph)",
+                        [row for row in aliases if row["isomorph"] is not None])
+
+
+def insert_graph(con, g, isomorph=None):
+    if g.is_connected() is False:
+        raise GraphIsNotConnectedError("Graph is not connected")
+
+    row = graph_to_row(g, isomorph)
+    con.execute(INSERT_SQL, row)
+    index_rows(con, [row])
+    con.commit()
+
+
+def write_group(con, parent, rows):
+    """
+    Write rows, built by graph_to_row, and record parent in the extended table, in the current transaction. parent may
+    be None.
+    """
+    con.executemany(INSERT_SQL, rows)
+    index_rows(con, rows)
+    if parent is not None:
+        con.execute("INSERT OR IGNORE INTO extended (parent) VALUES (?)", (pack_signature(parent),))
+
+
+def insert_row_groups(con, groups, batch_size=BATCH_SIZE):
+    """
+    Insert the rows of (parent, rows) groups, rows being built by graph_to_row, and commit once at least batch_size rows
+    are waiting. Each parent is recorded in the extended table in the same transaction as its rows, so after an
+    interruption every recorded parent has all its children in the database. parent may be None.
+
+    The rows are written as soon as their group is read: they are visible to the queries made on con (get_isomorph)
+    before being committed. Return the number of rows inserted.
+    """
+    count = 0
+    waiting = 0
+    for parent, rows in groups:
+        write_group(con, parent, rows)
+        waiting += len(rows)
+        if waiting >= batch_size:
+            con.commit()
+            count += waiting
+            waiting = 0
     con.commit()
+    return count + waiting
+
+
+class RowWriter(object):
+    """
+    Écriture des groupes (parent, rows) de insert_row_groups par un thread dédié, avec sa propre connexion à la base
+    path : le programme calcule pendant que SQLite écrit. Le thread réunit les groupes en transactions d'au moins
+    batch_size lignes, chaque parent étant validé avec ses fils (voir write_group).
+
+    put bloque tant que batch_size lignes ou plus attendent d'être validées (dans la file ou dans la transaction en
+    cours) : le calcul ne prend pas plus d'une transaction d'avance sur l'écriture, et un arrêt brutal perd au plus une
+    transaction, plus le dernier groupe mis en file. Les parents perdus ne sont pas dans la table extended et seront
+    repris au prochain lancement. close (ou la sortie d'un bloc with, y compris sur une exception ou un Ctrl-C) écrit
+    les groupes en attente, valide la dernière transaction et reporte le journal WAL dans la base.
+
+    pending contient les masters mis en file mais pas encore validés (signature canonique et signature, sous forme
+    d'entiers), que les connexions des autres threads ne voient pas encore ; voir MasterCache.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.uncommitted = 0
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.count = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="RowWriter", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        try:
+            con = open_db(self.path, wal=True)
+        except BaseException as e:
+            self._stop(e)
+            return
+        try:
+            waiting = []
+            while True:
+                group = self.queue.get()
+                if group is None:
+                    break
+                parent, rows = group
+                write_group(con, parent, rows)
+                waiting.extend(rows)
+                if len(waiting) >= self.batch_size:
+                    self._commit(con, waiting)
+                    waiting = []
+            self._commit(con, waiting)
+            con.execute("PRAGMA wal_checkpoint(FULL)")
+        except BaseException as e:
+            self._stop(e)
+        finally:
+            close_db(con)
+
+    def _stop(self, error):
+        with self.condition:
+            self.error = error
+            self.condition.notify_all()
+
+    def _commit(self, con, rows):
+        con.commit()
+        self.count += len(rows)
+        for row in rows:
+            self.pending.pop(row["canonical_signature"], None)
+        with self.condition:
+            self.uncommitted -= len(rows)
+            self.condition.notify_all()
+
+    def _check(self):
+        if self.error is not None or not self.thread.is_alive():
+            raise RuntimeError("The writer thread stopped") from self.error
+
+    def put(self, parent, rows):
+        """
+        Queue the rows of parent (see insert_row_groups), waiting while batch_size rows or more are not committed.
+        """
+        with self.condition:
+            while self.uncommitted >= self.batch_size:
+                self._check()
+                # Attente par intervalles, pour ne pas rester bloqué si le thread s'est arrêté.
+                self.condition.wait(timeout=1)
+            self._check()
+            self.uncommitted += len(rows)
+        for row in rows:
+            if row["isomorph"] == row["signature"]:
+                self.pending[row["canonical_signature"]] = row["signature"]
+        self.queue.put((parent, rows))
+
+    def close(self):
+        """
+        Write the queued groups, commit them and wait for the writer thread. Return the number of rows inserted.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.error is not None:
+            raise RuntimeError("The writer thread stopped") from self.error
+        return self.count
+
+
+def insert_rows(con, rows, batch_size=BATCH_SIZE):
+    """
+    Insert rows built by graph_to_row, batch_size rows per transaction. Return the number of rows inserted.
+    """
+    def groups():
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield None, batch
+                batch = []
+        yield None, batch
+
+    return insert_row_groups(con, groups(), batch_size)
+
+
+def insert_graphs(con, graphs, batch_size=BATCH_SIZE):
+    """
+    Insert (graph, isomorph) pairs, batch_size graphs per transaction. Return the number of graphs inserted.
+    """
+    def rows():
+        for g, isomorph in graphs:
+            if g.is_connected() is False:
+                raise GraphIsNotConnectedError("Graph is not connected")
+            yield graph_to_row(g, isomorph)
+
+    return insert_rows(con, rows(), batch_size)
 
 
 def get_graph(con, signature):
     cur = con.cursor()
 
-    g = cur.execute("SELECT * FROM graphs WHERE signature = ?", (signature,))
+    g = cur.execute("SELECT * FROM graphs WHERE signature = ?", (pack_signature(signature),))
     if g is None:
         return None
     else:
         return cur.fetchone()
 
 
-def create_table(con):
+def get_minimum_order_graphs(con, column, low, high):
+    """
+    Return a dict mapping every value v of column ("p3" or "p4") with low <= v <= high to the rows of the graphs of
+    smallest order having this value, in a single query.
+    """
+    if column not in ("p3", "p4"):
+        raise ValueError(f"Unknown column {column}")
+
     cur = con.cursor()
-    cur.execute("""CREATE TABLE IF NOT EXISTS graphs (
-                         signature TEXT NOT NULL PRIMARY KEY,
+    cur.execute(f"""SELECT graphs.* FROM graphs
+                    JOIN (SELECT {column} AS value, MIN(graph_order) AS min_order FROM graphs
+                          WHERE {column} BETWEEN ? AND ? GROUP BY {column}) AS best
+                    ON graphs.{column} = best.value AND graphs.graph_order = best.min_order
+                    ORDER BY graphs.{column}, graphs.signature""", (low, high))
+    graphs = {}
+    for row in cur.fetchall():
+        graphs.setdefault(row[column], []).append(row)
+    return graphs
+
+
+GRAPHS_TABLE = """CREATE TABLE IF NOT EXISTS {name} (
+                         signature INTEGER NOT NULL PRIMARY KEY,
                          property_hash TEXT NOT NULL,
                          graph_order INTEGER,
                          graph_size INTEGER,
-                         isomorph TEXT,
+                         isomorph INTEGER,
                          max_degree INTEGER,
                          degrees TEXT,
                          is_tree BOOLEAN,
                          is_bipartite BOOLEAN,
                          has_bridge BOOLEAN,
                          is_chordal BOOLEAN,
-                         is_complete BOOLEAN,   
+                         is_complete BOOLEAN,
                          min_cycle_basis_weight INTEGER,
                          min_cycle_basis_size INTEGER,
                          diameter INTEGER,
@@ -120,11 +502,118 @@ def create_table(con):
                          is_regular BOOLEAN,
                          p3 INTEGER,
                          p4 INTEGER,
-                         FOREIGN KEY(isomorph) REFERENCES graphs(signature)                                                                   
+                         canonical_signature INTEGER,
+                         FOREIGN KEY(isomorph) REFERENCES graphs(signature)
+    )
+    """
+
+SIGNATURE_COLUMNS = ("signature", "isomorph", "canonical_signature")
+
+
+def create_table(con):
+    cur = con.cursor()
+    cur.execute(GRAPHS_TABLE.format(name="graphs"))
+
+    # Les bases créées avant l'ajout de la colonne canonical_signature sont mises à jour ici, les valeurs manquantes
+    # sont calculées par update_canonical_signatures plus bas.
+    columns = {row[1]: row[2] for row in cur.execute("PRAGMA table_info(graphs)")}
+    if "canonical_signature" not in columns:
+        cur.execute("ALTER TABLE graphs ADD COLUMN canonical_signature INTEGER")
+    con.commit()
+    if columns["signature"] == "TEXT":
+        pack_signatures(con)
+    # Les recherches par signature canonique passent par la table masters : l'index de graphs ne servirait qu'à ralentir
+    # les insertions.
+    cur.execute("DROP INDEX IF EXISTS graphs_canonical_signature")
+    cur.execute("""CREATE TABLE IF NOT EXISTS extended (
+                         parent INTEGER NOT NULL PRIMARY KEY,
+                         FOREIGN KEY(parent) REFERENCES graphs(signature)
     )
     """)
+    # Les tables masters et aliases d'une base créée avant leur ajout sont remplies à partir de la table graphs.
+    new = cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' and name = 'masters'").fetchone() is None
+    cur.execute("""CREATE TABLE IF NOT EXISTS masters (
+                         canonical_signature INTEGER NOT NULL PRIMARY KEY,
+                         signature INTEGER NOT NULL UNIQUE,
+                         FOREIGN KEY(signature) REFERENCES graphs(signature)
+    )
+    """)
+    cur.execute("""CREATE TABLE IF NOT EXISTS aliases (
+                         signature INTEGER NOT NULL PRIMARY KEY,
+                         master INTEGER NOT NULL,
+                         FOREIGN KEY(signature) REFERENCES graphs(signature),
+                         FOREIGN KEY(master) REFERENCES graphs(signature)
+    )
+    """)
+    # Un graphe sans signature canonique serait absent de la table masters, et ses isomorphes seraient insérés comme
+    # de nouveaux masters : les signatures manquantes sont calculées avant toute recherche. L'index partiel, vide en
+    # temps normal, évite de parcourir la table graphs à chaque ouverture.
+    cur.execute("""CREATE INDEX IF NOT EXISTS graphs_without_canonical_signature ON graphs (signature)
+                   WHERE canonical_signature IS NULL""")
+    if cur.execute("SELECT 1 FROM graphs WHERE canonical_signature IS NULL LIMIT 1").fetchone() is not None:
+        update_canonical_signatures(con)
+    elif new:
+        index_masters(con)
+    # Index des requêtes de best_p3.py et best_p4.py ; la signature (rowid) fait partie de chaque index.
+    cur.execute("CREATE INDEX IF NOT EXISTS graphs_p3 ON graphs (p3, graph_order)")
+    cur.execute("CREATE INDEX IF NOT EXISTS graphs_p4 ON graphs (p4, graph_order)")
+    cur.execute("CREATE INDEX IF NOT EXISTS graphs_property_hash ON graphs (property_hash) WHERE isomorph = signature")
+
+    con.commit()
+
+
+def _pack_signature_or_none(s):
+    return None if s is None else pack_signature(s)
 
+
+def pack_signatures(con):
+    """
+    Convert a database storing signatures as '0'/'1' text to packed integer signatures. The table is rebuilt, then
+    the database file is compacted.
+    """
+    cur = con.cursor()
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(graphs)")]
+    con.create_function("pack_signature", 1, _pack_signature_or_none, deterministic=True)
+    values = [f"pack_signature({c})" if c in SIGNATURE_COLUMNS else c for c in columns]
+
+    cur.execute("DROP INDEX IF EXISTS graphs_canonical_signature")
+    cur.execute(GRAPHS_TABLE.format(name="graphs_packed"))
+    cur.execute(f"INSERT INTO graphs_packed ({', '.join(columns)}) SELECT {', '.join(values)} FROM graphs")
+    cur.execute("DROP TABLE graphs")
+    cur.execute("ALTER TABLE graphs_packed RENAME TO graphs")
+    con.commit()
+    cur.execute("VACUUM")
+
+
+def index_masters(con):
+    """
+    Fill the masters and aliases tables again from the isomorph and canonical_signature columns of the graphs table.
+    When several masters share a canonical signature, the one with the smallest signature is kept.
+    """
+    cur = con.cursor()
+    cur.execute("DELETE FROM masters")
+    cur.execute("DELETE FROM aliases")
+    cur.execute("""INSERT OR IGNORE INTO masters (canonical_signature, signature)
+                   SELECT canonical_signature, signature FROM graphs
+                   WHERE isomorph = signature and canonical_signature IS NOT NULL ORDER BY signature""")
+    cur.execute("""INSERT INTO aliases (signature, master)
+                   SELECT signature, isomorph FROM graphs WHERE isomorph IS NOT NULL and isomorph != signature""")
+    con.commit()
+
+
+def update_canonical_signatures(con):
+    """
+    Compute the canonical signature of every graph stored without one, and index the masters again.
+    """
+    cur = con.cursor()
+    rows = cur.execute("SELECT signature FROM graphs WHERE canonical_signature IS NULL").fetchall()
+    values = [(pack_signature(canonical_signature(matrix_from_signature(unpack_signature(row["signature"])))),
+               row["signature"]) for row in rows]
+    cur.executemany("UPDATE graphs SET canonical_signature = ? WHERE signature = ?", values)
     con.commit()
+    if values:
+        index_masters(con)
+    return len(values)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""
+Export des masters de graphs.db dans un format en colonnes, lisible par NumPy sans passer par SQLite.
+
+Pour chaque ordre n, le dossier order_n contient un fichier .npy par colonne : signature et canonical_signature (les
+signatures sous forme d'entiers, voir pack_signature, donc la matrice d'adjacence, voir matrices_from_packed), une
+colonne typée par propriété, et degrees, la suite des degrés de forme (N, n). Les valeurs NULL (p3 et p4 quand une
+arête n'est couverte par aucun chemin) sont remplacées par -1, et par 0 pour les signatures. Le fichier manifest.json
+donne le nombre de graphes de chaque ordre et le type de chaque colonne.
+
+Les fichiers s'ouvrent en mémoire partagée (numpy.load(..., mmap_mode="r")) : une requête sur des millions de graphes
+est un parcours vectorisé des colonnes concernées.
+    python export.py graphs.db snapshot
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from database import open_db, close_db, iterate_over_rows_of_order, signature_range, CHUNK_SIZE
+
+NULL = -1
+
+COLUMNS = {
+    "signature": np.uint64,
+    "canonical_signature": np.uint64,
+    "graph_order": np.int8,
+    "graph_size": np.int16,
+    "max_degree": np.int8,
+    "is_tree": np.int8,
+    "is_bipartite": np.int8,
+    "has_bridge": np.int8,
+    "is_chordal": np.int8,
+    "is_complete": np.int8,
+    "min_cycle_basis_weight": np.int16,
+    "min_cycle_basis_size": np.int16,
+    "diameter": np.int8,
+    "radius": np.int8,
+    "is_eulerian": np.int8,
+    "is_planar": np.int8,
+    "number_of_faces": np.int16,
+    "is_regular": np.int8,
+    "p3": np.int32,
+    "p4": np.int32,
+}
+
+
+def order_folder(folder, n):
+    return os.path.join(folder, f"order_{n}")
+
+
+def count_masters(con, n):
+    cur = con.execute("SELECT COUNT(*) FROM graphs WHERE signature >= ? and signature < ? and isomorph = signature",
+                      signature_range(n))
+    return cur.fetchone()[0]
+
+
+def export_order(con, folder, n):
+    """
+    Write the columns of the masters of order n in folder/order_n and return the number of graphs written.
+    """
+    count = count_masters(con, n)
+    os.makedirs(order_folder(folder, n), exist_ok=True)
+    arrays = {column: open_memmap(os.path.join(order_folder(folder, n), f"{column}.npy"), mode="w+", dtype=dtype,
+                                  shape=(count,))
+              for column, dtype in COLUMNS.items()}
+    degrees = open_memmap(os.path.join(order_folder(folder, n), "degrees.npy"), mode="w+", dtype=np.uint8,
+                          shape=(count, n))
+
+    def write(start, rows):
+        if start + len(rows) > count:
+            raise RuntimeError(f"The masters of order {n} changed during the export")
+        for column, array in arrays.items():
+            null = 0 if array.dtype == np.uint64 else NULL
+            array[start:start + len(rows)] = [null if row[column] is None else row[column] for row in rows]
+        degrees[start:start + len(rows)] = [[int(d) for d in row["degrees"].split(",")] for row in rows]
+
+    start = 0
+    rows = []
+    for row in iterate_over_rows_of_order(con, n, masters=True):
+        rows.append(row)
+        if len(rows) == CHUNK_SIZE:
+            write(start, rows)
+            start += len(rows)
+            rows = []
+    if rows:
+        write(start, rows)
+        start += len(rows)
+    if start != count:
+        raise RuntimeError(f"The masters of order {n} changed during the export")
+
+    for array in list(arrays.values()) + [degrees]:
+        array.flush()
+    return count
+
+
+def export_db(con, folder, orders=range(1, 12)):
+    """
+    Export the masters of each order of orders which has graphs in the database, and write folder/manifest.json.
+    """
+    os.makedirs(folder, exist_ok=True)
+    counts = {}
+    for n in orders:
+        if count_masters(con, n) > 0:
+            counts[n] = export_order(con, folder, n)
+
+    manifest = {
+        "orders": counts,
+        "columns": {column: np.dtype(dtype).name for column, dtype in COLUMNS.items()},
+        "null": NULL,
+    }
+    with open(os.path.join(folder, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return counts
+
+
+def open_snapshot(folder):
+    """
+    Return {order: {column: array}} for a snapshot written by export_db, the arrays being memory mapped.
+    """
+    with open(os.path.join(folder, "manifest.json")) as f:
+        manifest = json.load(f)
+    snapshot = {}
+    for n in sorted(int(n) for n in manifest["orders"]):
+        snapshot[n] = {column: np.load(os.path.join(order_folder(folder, n), f"{column}.npy"), mmap_mode="r")
+                       for column in list(manifest["columns"]) + ["degrees"]}
+    return snapshot
+
+
+def minimum_orders(snapshot, column):
+    """
+    Return {value: order} giving, for each value of column, the smallest order of a graph having this value.
+    """
+    result = {}
+    for n in sorted(snapshot, reverse=True):
+        for value in np.unique(snapshot[n][column]):
+            if value != NULL:
+                result[int(value)] = n
+    return result
+
+
+def joint_distribution(snapshot, columns, orders=None):
+    """
+    Return (values, counts): the distinct combinations of values of columns among the graphs of orders (all by
+    default), as an array of shape (K, len(columns)), and the number of graphs having each of them.
+    """
+    orders = sorted(snapshot) if orders is None else orders
+    stacked = np.concatenate([np.stack([np.asarray(snapshot[n][c], dtype=np.int64) for c in columns], axis=1)
+                              for n in orders])
+    return np.unique(stacked, axis=0, return_counts=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the master graphs to memory-mappable NumPy columns.")
+    parser.add_argument("database", nargs="?", default="graphs.db")
+    parser.add_argument("folder", nargs="?", default="snapshot")
+    args = parser.parse_args()
+
+    con = open_db(args.database)
+    try:
+        for n, count in export_db(con, args.folder).items():
+            print(f"Order {n}: {count} graphs")
+    finally:
+        close_db(con)
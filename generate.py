@@ -1,57 +1,238 @@
-from graph import Graph, GraphIsNotConnectedError
-from database import insert_graph, get_isomorph, iterate_over_graphs_of_order, open_db, close_db
-from itertools import product
+from graph import Graph
+from database import insert_graph, MasterCache, iterate_over_graphs_of_order, iterate_over_adjacency_of_order, \
+    open_db, close_db, graph_to_row, get_master_signatures, get_known_canonical_signatures, database_path, RowWriter, \
+    BATCH_SIZE
+from collections import Counter
+from functools import lru_cache
+from multiprocessing import Pool
 from tqdm import tqdm
-import networkx as nx
-from graph import matrix_from_signature, signature_from_matrix
+from canonical import canonical_extensions
+from batch import GraphBatch
+import numpy as np
+import profiling
+
+CANDIDATES_CHUNK_SIZE = 1 << 14
 
 nb_of_graphs = [1, 1, 1, 2, 6, 21, 112, 853, 11117, 261080, 11716571, 1006700565, 164059830476, 50335907869219, 29003487462848061, 31397381142761241960, 63969560113225176176277, 245871831682084026519528568, 1787331725248899088890200576580]
 
+# Étapes du filtrage des graphes candidats, de la moins coûteuse à la plus coûteuse : un graphe non connexe est rejeté
+# dès sa construction, un graphe dont l'empreinte (degrés, triangles) est inconnue est nouveau, les autres sont
+# comparés par signature canonique aux graphes du même parent, puis aux masters (cache, puis base). Les deux derniers
+# compteurs sont ceux du cache des masters.
+STAGES = ("candidates", "disconnected", "new fingerprint", "duplicate", "isomorph", "inserted", "cache hits",
+          "cache misses")
+# Avec l'augmentation canonique, un candidat par orbite de voisinages ; ceux dont le graphe n'a pas ce parent pour
+# parent canonique sont rejetés, les autres sont insérés sans recherche d'isomorphe.
+AUGMENTATION_STAGES = ("candidates", "not canonical", "inserted")
 
-def enumerate_all_signature():
-    con = open_db()
-    for size in tqdm(range(6, 7)):
-        repeat = sum(range(1, size + 1))
 
-        for signature in tqdm(product("01", repeat=repeat)):
-            try:
-                g = Graph(signature="".join(signature))
-                signature = get_isomorph(con, g)
-                if signature is None:
-                    signature = g.signature
-                    insert_graph(con, g, isomorph=signature)
-            except GraphIsNotConnectedError:
-                continue
+def neighbourhood_of_new_vertex(child):
+    # Voisinage du sommet 0 d'un graphe fils produit par canonical_extensions, sur les sommets du parent.
+    return [(child[0] >> (i + 1)) & 1 for i in range(len(child) - 1)]
+
+
+@lru_cache(maxsize=None)
+def all_neighbourhoods(n):
+    """
+    Return the (2^n - 1, n) array of the non empty neighbourhoods of a new vertex on n vertices, in the order of
+    product("01", repeat=n): the first vertex is the most significant bit.
+    """
+    return (np.arange(1, 1 << n)[:, np.newaxis] >> np.arange(n - 1, -1, -1)) & 1
+
+
+def children_batch(parent, neighbourhoods):
+    # Les graphes fils de parent, un par voisinage du nouveau sommet, construits d'un bloc.
+    return GraphBatch.extensions(parent, neighbourhoods)
+
+
+def known_fingerprints(con, n):
+    """
+    Return the set of the fingerprints of the masters of order n already in the database. The fingerprint of a graph is
+    (degrees, number_of_triangles): two graphs with different fingerprints are not isomorphic. The masters are read
+    chunk by chunk as adjacency matrices and their fingerprints computed by batch (see GraphBatch.fingerprints).
+    """
+    fingerprints = set()
+    for _, adjs in iterate_over_adjacency_of_order(con, n, masters=True):
+        fingerprints.update(GraphBatch(adjs=adjs).fingerprints())
+    return fingerprints
 
-    close_db(con)
 
+def print_stats(stats, stages=STAGES):
+    for stage in stages:
+        print(f"{stage}: {stats[stage]}")
 
-def extend_db_with_one_node(n):
-    con = open_db()
 
-    if n <= 1:
-        s = "1"
-        ngraph = Graph(signature=s)
-        insert_graph(con, ngraph, isomorph=s)
-    else:
-        for current in tqdm(iterate_over_graphs_of_order(con, n), total=nb_of_graphs[n]):
-            s = signature_from_matrix(nx.adjacency_matrix(current.g).todense())
-            for l in product("01", repeat=n):
-                try:
-                    if sum([int(i) for i in l]) == 0:
+def insert_new_graphs(con, groups, fingerprints, stats, batch_size=BATCH_SIZE):
+    """
+    groups yields (parent, batch) pairs, batch being a GraphBatch of candidate graphs and parent the signature of the
+    graph they were built from, or None. Insert as masters the connected graphs which have no isomorph in the database,
+    batch_size graphs per transaction, and record each parent as extended with its graphs (see insert_row_groups).
+
+    fingerprints is the set of the fingerprints of the masters of the order of the graphs (see known_fingerprints) and
+    is kept up to date. A graph whose fingerprint is not in it is new: neither its canonical signature nor an isomorph
+    lookup is needed. Connectivity and fingerprints are computed for the whole batch at once; a Graph is only built for
+    the candidates that pass these stages. The counters of stats are updated for each stage.
+
+    The masters found or inserted are kept in a MasterCache, so that most isomorph lookups do not reach the database.
+    The rows are written by a RowWriter while the next groups are computed.
+    """
+    with RowWriter(database_path(con), batch_size) as writer:
+        masters = MasterCache(con, pending=writer.pending)
+        for parent, batch in groups:
+            connected = batch.connected
+            stats["disconnected"] += len(batch) - int(connected.sum())
+            keys = batch.fingerprints()
+            new = {}
+            for i in np.flatnonzero(connected):
+                key = keys[i]
+                g = batch.graph(i)
+                if key in fingerprints:
+                    if g.canonical_signature in new:
+                        stats["duplicate"] += 1
                         continue
-                    ns = "".join(l) + s
-                    ngraph = Graph(signature=ns)
-                    signature = get_isomorph(con, ngraph)
-                    if signature is None:
-                        signature = ngraph.signature
-                        insert_graph(con, ngraph, isomorph=signature)
-                except GraphIsNotConnectedError:
-                    print("Not connected")
+                    if masters.get_isomorph(g) is not None:
+                        stats["isomorph"] += 1
+                        continue
+                else:
+                    stats["new fingerprint"] += 1
+                    fingerprints.add(key)
+                new[g.canonical_signature] = graph_to_row(g, isomorph=g.signature)
+                masters.add(g.canonical_signature, g.signature)
+            stats["inserted"] += len(new)
+            stats["cache hits"], stats["cache misses"] = masters.hits, masters.misses
+            writer.put(parent, list(new.values()))
+
+
+def enumerate_all_signature(orders=(7,)):
+    """
+    Insert the connected graphs of each order of orders by going through all the signatures of this order, and return
+    the counters of the stages. The masters already in the database are found by isomorph lookups, so a run can be
+    started again.
+    """
+    con = open_db(wal=True)
+    stats = Counter()
+    profiling.watch("enumerate_all_signature", stats)
+
+    def batches(repeat):
+        # Toutes les signatures de repeat bits, dans l'ordre de product("01", repeat=repeat), par blocs.
+        for start in tqdm(range(0, 1 << repeat, CANDIDATES_CHUNK_SIZE)):
+            stop = min(start + CANDIDATES_CHUNK_SIZE, 1 << repeat)
+            signatures = (1 << repeat) + np.arange(start, stop, dtype=np.uint64)
+            stats["candidates"] += len(signatures)
+            yield None, GraphBatch(signatures=signatures)
+
+    try:
+        for n in tqdm(orders):
+            insert_new_graphs(con, batches(n * (n - 1) // 2), known_fingerprints(con, n), stats)
+    finally:
+        close_db(con)
+        print_stats(stats)
+    return stats
+
+
+def extend_db_with_one_node(n, canonical_augmentation=False):
+    """
+    Add to the database the graphs of order n + 1 obtained by adding one vertex to the graphs of order n.
+
+    With canonical_augmentation, each isomorphism class of order n + 1 is produced exactly once (see canonical.py), so
+    no isomorph lookup is made: the masters of order n must be complete.
+
+    The graphs of order n whose children are all inserted are recorded in the extended table and skipped, so an
+    interrupted run can be started again and goes on from where it stopped.
+    """
+    con = open_db(wal=True)
+
+    stats = Counter()
+    profiling.watch(f"extend_db_with_one_node({n})", stats)
+
+    def augmented_graphs():
+        for current in tqdm(iterate_over_graphs_of_order(con, n, masters=True, skip_extended=True),
+                            total=nb_of_graphs[n]):
+            neighbourhoods = [neighbourhood_of_new_vertex(child)
+                              for child in canonical_extensions(current.rows, stats)]
+            batch = children_batch(current, neighbourhoods)
+            graphs = (batch.graph(i) for i in range(len(batch)))
+            stats["inserted"] += len(batch)
+            yield current.signature, [graph_to_row(g, isomorph=g.signature) for g in graphs]
+
+    def extended_graphs():
+        for current in tqdm(iterate_over_graphs_of_order(con, n, skip_extended=True), total=nb_of_graphs[n]):
+            # Le voisinage vide, qui donnerait un graphe non connexe, n'est pas construit.
+            stats["candidates"] += 1 << n
+            stats["disconnected"] += 1
+            yield current.signature, children_batch(current, all_neighbourhoods(n))
+
+    try:
+        if n <= 1:
+            s = "1"
+            ngraph = Graph(signature=s)
+            insert_graph(con, ngraph, isomorph=s)
+        elif canonical_augmentation:
+            with RowWriter(database_path(con)) as writer:
+                for parent, rows in augmented_graphs():
+                    writer.put(parent, rows)
+            print_stats(stats, AUGMENTATION_STAGES)
+        else:
+            insert_new_graphs(con, extended_graphs(), known_fingerprints(con, n + 1), stats)
+            print_stats(stats)
+    finally:
+        # Une transaction non terminée est annulée : les parents qu'elle contenait seront repris au prochain lancement.
+        close_db(con)
+
+
+def _extend_shard(args):
+    # Travail d'un processus : les graphes fils de chaque parent de la tranche, dédoublonnés dans la tranche, avec
+    # toutes leurs propriétés calculées.
+    signatures, canonical_augmentation = args
+    groups = []
+    seen = set()
+    for s in signatures:
+        parent = Graph(signature=s)
+        if canonical_augmentation:
+            neighbourhoods = [neighbourhood_of_new_vertex(child) for child in canonical_extensions(parent.rows)]
+        else:
+            neighbourhoods = all_neighbourhoods(parent.order)
+        batch = children_batch(parent, neighbourhoods)
+        rows = []
+        for i in range(len(batch)):
+            ngraph = batch.graph(i)
+            if ngraph.canonical_signature in seen:
+                continue
+            seen.add(ngraph.canonical_signature)
+            rows.append(graph_to_row(ngraph, isomorph=ngraph.signature))
+        groups.append((s, rows))
+    return groups
+
+
+def extend_db_with_one_node_in_parallel(n, workers=None, canonical_augmentation=True, shard_size=64):
+    """
+    Same as extend_db_with_one_node, with the parents of order n split in shards of shard_size graphs handled by a pool
+    of workers processes. The current process is the only one writing to the database: it drops the graphs whose
+    canonical signature is already known and hands the others to a RowWriter, recording the parents as extended.
+
+    Shards are built from the sorted master signatures and their results are written in order, so the content of the
+    database does not depend on the number of workers. Parents already extended are skipped.
+    """
+    con = open_db(wal=True)
+    parents = get_master_signatures(con, n, skip_extended=True)
+    shards = [(parents[i:i + shard_size], canonical_augmentation) for i in range(0, len(parents), shard_size)]
 
-    close_db(con)
+    try:
+        with Pool(workers) as pool, RowWriter(database_path(con)) as writer:
+            for groups in tqdm(pool.imap(_extend_shard, shards), total=len(shards)):
+                canonical_signatures = [row["canonical_signature"] for _, rows in groups for row in rows]
+                # Les masters encore dans la file du writer ne sont pas visibles dans la base. pending est lu avant la
+                # base, comme dans MasterCache.get_isomorph : un master validé entre les deux lectures n'est plus dans
+                # pending mais il est alors dans la base.
+                known = {c for c in canonical_signatures if c in writer.pending}
+                known.update(get_known_canonical_signatures(con, canonical_signatures))
+                for parent, rows in groups:
+                    writer.put(parent, [row for row in rows if row["canonical_signature"] not in known])
+    finally:
+        close_db(con)
 
 
 if __name__ == "__main__":
+    profiling.enable_from_environment()
     # enumerate_all_signature()
     extend_db_with_one_node(8)
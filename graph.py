@@ -1,12 +1,32 @@
 import networkx as nx
 import numpy as np
 import math
-from functools import total_ordering
+from functools import total_ordering, cached_property
 import hashlib
+from canonical import canonical_signature, rows_from_matrix
+import bitgraph
+import kernels
 
 
 @total_ordering
 class Graph(object):
+    """
+    Les propriétés sont calculées à la demande puis gardées en cache. Le premier niveau (ordre, taille, degrés) est
+    calculé directement sur la matrice d'adjacence et sert au hachage ; les autres propriétés ne sont calculées que si
+    elles sont lues, par exemple lors de l'insertion dans la base de données. Un graphe chargé depuis la base (row)
+    reprend les valeurs stockées et ne calcule que celles qui manquent.
+
+    La connexité, les distances, la bipartition, les arbres et les ponts sont calculés sur les lignes de bits de la
+    matrice d'adjacence (bitgraph.py), comme la base de cycles minimale ; le graphe networkx (g) n'est construit que
+    pour la cordalité, la planarité quand elle ne se déduit pas du nombre d'arêtes, ou pour l'affichage.
+    """
+
+    CHEAP_PROPERTIES = ("order", "size", "max_degree", "degrees")
+    PROPERTIES = CHEAP_PROPERTIES + ("is_tree", "is_bipartite", "has_bridge", "is_chordal", "is_complete",
+                                     "min_cycle_basis_weight", "min_cycle_basis_size", "diameter", "radius",
+                                     "is_eulerian", "is_planar", "number_of_faces", "is_regular", "p3", "p4")
+    COLUMNS = {"order": "graph_order", "size": "graph_size"}
+
     def __init__(self, signature=None, adj=None, row=None):
         if signature is not None and adj is not None:
             raise ValueError("Either signature or array must be provided, not both")
@@ -20,58 +40,165 @@ class Graph(object):
         else:
             raise ValueError("Either signature or array must be provided")
 
-        self.g = nx.from_numpy_array(self.adj)
-        if not nx.is_connected(self.g):
-            raise GraphIsNotConnectedError()
-
         if row is None:
-            self.order = len(self.adj)
-            self.size = self.g.number_of_edges()
-            self.max_degree = max(d for _, d in self.g.degree())
-            degrees = sorted([d for u, d in self.g.degree()])
-            self.degrees = ",".join([str(d) for d in degrees])
-            self.is_tree = nx.is_tree(self.g)
-            self.is_bipartite = nx.is_bipartite(self.g)
-            self.has_bridge = nx.has_bridges(self.g)
-            try:
-                c = nx.is_chordal(self.g)
-            except nx.exception.NetworkXError:
-                c = False
-            self.is_chordal = c
-            self.is_complete = self.size == self.order * (self.order - 1) / 2
-            cycle_basis = nx.minimum_cycle_basis(self.g)
-            self.min_cycle_basis_weight = sum(len(cycle) for cycle in cycle_basis)
-            self.min_cycle_basis_size = len(cycle_basis)
-            self.diameter = nx.diameter(self.g)
-            self.radius = nx.radius(self.g)
-            self.is_eulerian = nx.is_eulerian(self.g)
-            self.is_planar = nx.is_planar(self.g)
-            self.number_of_faces = 2 - self.order + self.size
-            self.is_regular = nx.is_regular(self.g)
-            self.p3 = self.number_of_p3()
-            self.p4 = self.number_of_p4()
-            self.property_hash = self.compute_property_hash()
+            if not bitgraph.is_connected(self.rows):
+                raise GraphIsNotConnectedError()
         else:
-            self.order = row["graph_order"]
-            self.size = row["graph_size"]
-            self.max_degree = row["max_degree"]
-            self.degrees = row["degrees"]
-            self.is_tree = row["is_tree"]
-            self.is_bipartite = row["is_bipartite"]
-            self.has_bridge = row["has_bridge"]
-            self.is_chordal = row["is_chordal"]
-            self.is_complete = row["is_complete"]
-            self.min_cycle_basis_weight = row["min_cycle_basis_weight"]
-            self.min_cycle_basis_size = row["min_cycle_basis_size"]
-            self.diameter = row["diameter"]
-            self.radius = row["radius"]
-            self.is_eulerian = row["is_eulerian"]
-            self.is_planar = row["is_planar"]
-            self.number_of_faces = row["number_of_faces"]
-            self.is_regular = row["is_regular"]
-            self.p3 = row["p3"]
-            self.p4 = row["p4"]
-            self.property_hash = row["property_hash"]
+            keys = row.keys()
+            for name in self.PROPERTIES + ("property_hash",):
+                column = self.COLUMNS.get(name, name)
+                if column in keys:
+                    setattr(self, name, row[column])
+            if "canonical_signature" in keys and row["canonical_signature"] is not None:
+                self.canonical_signature = unpack_signature(row["canonical_signature"])
+
+    @classmethod
+    def _from_connected(cls, signature, adj):
+        # Graphe dont la signature et la connexité sont déjà connues (voir GraphBatch.graph) : rien n'est recalculé.
+        g = cls.__new__(cls)
+        g.signature = signature
+        g.adj = adj
+        return g
+
+    @cached_property
+    def g(self):
+        return nx.from_numpy_array(self.adj)
+
+    @cached_property
+    def rows(self):
+        return rows_from_matrix(self.adj)
+
+    @cached_property
+    def distances(self):
+        return np.array(bitgraph.distance_matrix(self.rows), dtype=int)
+
+    @cached_property
+    def _eccentricities(self):
+        return self.distances.max(axis=1, initial=0)
+
+    @cached_property
+    def order(self):
+        return len(self.adj)
+
+    @cached_property
+    def size(self):
+        return int(np.sum(self.adj)) // 2
+
+    @cached_property
+    def max_degree(self):
+        return int(np.max(np.sum(self.adj, axis=1)))
+
+    @cached_property
+    def degrees(self):
+        return ",".join(str(int(d)) for d in sorted(np.sum(self.adj, axis=1)))
+
+    @cached_property
+    def is_tree(self):
+        return bitgraph.is_tree(self.rows)
+
+    @cached_property
+    def is_bipartite(self):
+        return bitgraph.is_bipartite(self.rows)
+
+    @cached_property
+    def has_bridge(self):
+        return bitgraph.has_bridge(self.rows)
+
+    @cached_property
+    def is_chordal(self):
+        try:
+            return nx.is_chordal(self.g)
+        except nx.exception.NetworkXError:
+            return False
+
+    @cached_property
+    def is_complete(self):
+        return self.size == self.order * (self.order - 1) / 2
+
+    @cached_property
+    def _min_cycle_basis(self):
+        return bitgraph.minimum_cycle_basis(self.rows)
+
+    @cached_property
+    def min_cycle_basis_weight(self):
+        return sum(cycle.bit_count() for cycle in self._min_cycle_basis)
+
+    @cached_property
+    def min_cycle_basis_size(self):
+        # Dimension de l'espace des cycles d'un graphe connexe.
+        return self.size - self.order + 1
+
+    @cached_property
+    def diameter(self):
+        return int(self._eccentricities.max())
+
+    @cached_property
+    def radius(self):
+        return int(self._eccentricities.min())
+
+    @cached_property
+    def wiener_index(self):
+        return int(self.distances.sum()) // 2
+
+    @cached_property
+    def is_eulerian(self):
+        return bitgraph.is_eulerian(self.rows)
+
+    @cached_property
+    def is_planar(self):
+        # Un graphe non planaire contient une subdivision de K5 ou de K3,3, donc au moins 3 arêtes de plus que de
+        # sommets. Un graphe planaire a au plus 3n - 6 arêtes, et au plus 2n - 4 s'il n'a pas de triangle.
+        if self.size - self.order <= 2:
+            return True
+        if self.size > 3 * self.order - 6:
+            return False
+        if self.is_bipartite and self.size > 2 * self.order - 4:
+            return False
+        return nx.is_planar(self.g)
+
+    @cached_property
+    def number_of_faces(self):
+        return 2 - self.order + self.size
+
+    @cached_property
+    def is_regular(self):
+        return bitgraph.is_regular(self.rows)
+
+    @cached_property
+    def number_of_triangles(self):
+        return int(kernels.count_triangles(self.adj)[0])
+
+    @cached_property
+    def _p3_coverage(self):
+        counts, covering = kernels.p3_coverage(self.adj)
+        return int(counts[0]), covering[0]
+
+    @cached_property
+    def _p4_coverage(self):
+        counts, covering = kernels.p4_coverage(self.adj)
+        return int(counts[0]), covering[0]
+
+    @cached_property
+    def p3(self):
+        return self.number_of_p3()
+
+    @cached_property
+    def p4(self):
+        return self.number_of_p4()
+
+    @cached_property
+    def property_hash(self):
+        return self.compute_property_hash()
+
+    @cached_property
+    def canonical_signature(self):
+        return canonical_signature(self.adj)
+
+    def cheap_key(self):
+        """
+        Return the cheap tier of properties (order, size, degree sequence), used for hashing.
+        """
+        return self.order, self.size, self.degrees
 
     def compute_property_hash(self):
         m = hashlib.sha256()
@@ -99,70 +226,25 @@ class Graph(object):
         return m.hexdigest()
 
     def is_connected(self):
-        return nx.is_connected(self.g)
+        return bitgraph.is_connected(self.rows)
 
     def number_of_p4(self):
-        count = 0
-        covering = set()
-        visited = set()
-        for a, b in self.g.edges:
-            for u, v in self.g.edges:
-                e = self.adj[a, u] + self.adj[a, v] + self.adj[b, u] + self.adj[b, v]
-                if tuple(sorted((a, b, u, v))) in visited:
-                    continue
-                elif e == 1:
-                    count += 1
-                    covering.add(tuple(sorted((a, b))))
-                    covering.add(tuple(sorted((u, v))))
-                    visited.add(tuple(sorted((a, b, u, v))))
-                    if self.adj[a, u] == 1:
-                        covering.add(tuple(sorted((a, u))))
-                    elif self.adj[a, v] == 1:
-                        covering.add(tuple(sorted((a, v))))
-                    elif self.adj[b, u] == 1:
-                        covering.add(tuple(sorted((b, u))))
-                    elif self.adj[b, v] == 1:
-                        covering.add(tuple(sorted((b, v))))
-
-        if len(covering) == self.size:
-            return count
-        else:
-            return None
+        count, covering = self._p4_coverage
+        return count if (covering == (self.adj == 1)).all() else None
 
     def number_of_p3(self):
         # On cherche le nombre de chaine de longueur 3 mais dont les sommets ne forment pas
         # un triangle induit.
         # Cette valeur vaut None si toutes les arêtes ne sont pas couvertes.
-        count = 0
-        covering = set()
-        visited = set()
-        for a, b in self.g.edges:
-            for c in self.g.nodes - {a, b}:
-                if self.adj[a, b] and self.adj[b, c] and self.adj[a, c]:
-                    continue
-                if self.adj[a, c]:
-                    if tuple(sorted((a, b, c))) in visited:
-                        continue
-                    else:
-                        count += 1
-                        covering.add(tuple(sorted((a, b))))
-                        covering.add(tuple(sorted((a, c))))
-                        visited.add(tuple(sorted((a, b, c))))
-                if self.adj[b, c]:
-                    if tuple(sorted((a, b, c))) in visited:
-                        continue
-                    else:
-                        count += 1
-                        covering.add(tuple(sorted((a, b))))
-                        covering.add(tuple(sorted((b, c))))
-                        visited.add(tuple(sorted((a, b, c))))
-
-        if len(covering) == self.size:
-            return count
-        else:
-            return None
+        count, covering = self._p3_coverage
+        return count if (covering == (self.adj == 1)).all() else None
+
+    def __hash__(self):
+        return hash(self.cheap_key())
 
     def __eq__(self, other):
+        if self.cheap_key() != other.cheap_key():
+            return False
         b = ((
                  self.order,
                  self.size,
@@ -204,7 +286,7 @@ class Graph(object):
         if not b:
             return False
         else:
-            return nx.is_isomorphic(self.g, other.g)
+            return self.canonical_signature == other.canonical_signature
 
     def __lt__(self, other):
         return ((
@@ -247,7 +329,7 @@ class Graph(object):
                 )
 
     def isomorph_with(self, other):
-        return self.property_hash == other.property_hash and nx.is_isomorphic(self.g, other.g)
+        return self.canonical_signature == other.canonical_signature
 
 
 class GraphIsNotConnectedError(Exception):
@@ -255,21 +337,58 @@ class GraphIsNotConnectedError(Exception):
 
 
 def signature_from_matrix(matrix):
-    return "".join(["".join(str(int(i)) for i in l[j + 1:]) for j, l in enumerate(matrix[:-1])])
+    matrix = np.asarray(matrix)
+    bits = matrix[np.triu_indices(len(matrix), 1)].astype(np.uint8) + ord("0")
+    return bits.tobytes().decode()
 
 
 def matrix_from_signature(s):
     r = get_root_of_triangular_number(len(s)) + 1
     matrix = np.zeros((r, r), dtype=int)
-    c = 0
-    for i in range(r - 1):
-        for j in range(i + 1, r):
-            matrix[i, j] = int(s[c])
-            matrix[j, i] = int(s[c])
-            c += 1
+    i, j = np.triu_indices(r, 1)
+    bits = np.frombuffer(s.encode(), dtype=np.uint8) - ord("0")
+    matrix[i, j] = bits
+    matrix[j, i] = bits
     return matrix
 
 
+# Dans la base de données, une signature est stockée sous forme d'entier : un bit à 1, suivi des bits de la signature.
+# Le premier bit permet de retrouver la longueur de la signature, donc l'ordre du graphe. Une signature d'ordre 11
+# tient sur 56 bits, ce qui reste dans les entiers 64 bits de SQLite.
+
+def pack_signature(s):
+    return int("1" + s, 2)
+
+
+def unpack_signature(x):
+    return bin(x)[3:]
+
+
+def packed_from_matrices(adjs):
+    """
+    Return the packed signatures of a stack of adjacency matrices of shape (N, n, n), as an uint64 array.
+    """
+    adjs = np.asarray(adjs)
+    n = adjs.shape[-1]
+    i, j = np.triu_indices(n, 1)
+    weights = np.left_shift(np.uint64(1), np.arange(len(i) - 1, -1, -1, dtype=np.uint64))
+    return (adjs[..., i, j].astype(np.uint64) @ weights) | np.left_shift(np.uint64(1), np.uint64(len(i)))
+
+
+def matrices_from_packed(values, n):
+    """
+    Return the stack of adjacency matrices of shape (N, n, n) of the packed signatures values of graphs of order n.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    i, j = np.triu_indices(n, 1)
+    shifts = np.arange(len(i) - 1, -1, -1, dtype=np.uint64)
+    bits = (np.right_shift(values[:, np.newaxis], shifts) & np.uint64(1)).astype(int)
+    matrices = np.zeros((len(values), n, n), dtype=int)
+    matrices[:, i, j] = bits
+    matrices[:, j, i] = bits
+    return matrices
+
+
 def get_root_of_triangular_number(n):
     t = int(math.sqrt(2 * n))
     if t * (t + 1) == 2 * n:
@@ -0,0 +1,206 @@
+"""
+Noyaux NumPy vectorisés. Les fonctions prennent une pile de matrices d'adjacence de même ordre, de forme (N, n, n)
+(une matrice seule de forme (n, n) est aussi acceptée), et calculent la valeur de chaque graphe en un seul appel.
+"""
+
+from functools import lru_cache
+from itertools import combinations
+import numpy as np
+
+
+def as_stack(adjs):
+    adjs = np.asarray(adjs, dtype=np.int64)
+    if adjs.ndim == 2:
+        adjs = adjs[np.newaxis]
+    return adjs
+
+
+def count_triangles(adjs):
+    """
+    Return the number of triangles of each graph.
+    """
+    adjs = as_stack(adjs)
+    return np.einsum("kij,kjl,kli->k", adjs, adjs, adjs) // 6
+
+
+def p3_coverage(adjs):
+    """
+    Return (counts, covering): for each graph, the number of induced paths on 3 vertices (3 vertices with exactly 2
+    edges, so not a triangle) and the boolean matrix of the edges lying on one of them.
+    """
+    adjs = as_stack(adjs)
+    degrees = adjs.sum(axis=2)
+    common = adjs @ adjs
+    counts = (degrees * (degrees - 1) // 2).sum(axis=1) - 3 * count_triangles(adjs)
+
+    # L'arête uv est sur un P3 induit si un autre sommet est voisin de u ou de v, mais pas des deux.
+    private = degrees[:, :, np.newaxis] + degrees[:, np.newaxis, :] - 2 - 2 * common
+    covering = (adjs == 1) & (private > 0)
+    return counts, covering
+
+
+def p3_through(adjs, vertex=0):
+    """
+    Return (counts, covering) as p3_coverage, restricted to the induced P3 that contain vertex.
+    """
+    adjs = as_stack(adjs)
+    neighbours = adjs[:, vertex]
+    degrees = adjs.sum(axis=2)
+    common = np.einsum("kj,kji->ki", neighbours, adjs)
+    d = degrees[:, vertex]
+
+    # vertex au centre : deux voisins non adjacents ; vertex à une extrémité : un voisin u et un voisin de u qui
+    # n'est pas voisin de vertex.
+    centre = d * (d - 1) // 2 - (neighbours * common).sum(axis=1) // 2
+    ends = (neighbours * (degrees - 1 - common)).sum(axis=1)
+
+    # Une arête ab qui ne touche pas vertex est sur un tel P3 si vertex est voisin de a ou de b, mais pas des deux.
+    covering = (adjs == 1) & (neighbours[:, :, np.newaxis] != neighbours[:, np.newaxis, :])
+    private = (neighbours == 1) & (d[:, np.newaxis] + degrees - 2 - 2 * common > 0)
+    covering[:, vertex, :] = private
+    covering[:, :, vertex] = private
+    return centre + ends, covering
+
+
+def count_p3(adjs):
+    """
+    Return (counts, covered): for each graph, the number of induced paths on 3 vertices and whether every edge lies on
+    one of them.
+    """
+    counts, covering = p3_coverage(adjs)
+    return counts, (covering == (as_stack(adjs) == 1)).all(axis=(1, 2))
+
+
+@lru_cache(maxsize=None)
+def _quadruples(n, vertex=None):
+    # Pour chaque ensemble de 4 sommets (contenant vertex s'il est donné), les 6 paires de sommets qu'il contient :
+    # indices (ligne, colonne) dans la matrice d'adjacence, et incidence entre les paires et les 4 sommets pour
+    # calculer les degrés induits.
+    quadruples = [q for q in combinations(range(n), 4) if vertex is None or vertex in q]
+    pairs = np.array([list(combinations(q, 2)) for q in quadruples], dtype=np.int64).reshape(len(quadruples), 6, 2)
+    incidence = np.array([[1 if v in p else 0 for v in range(4)] for p in combinations(range(4), 2)], dtype=np.int64)
+    return pairs[:, :, 0], pairs[:, :, 1], incidence
+
+
+def p4_coverage(adjs, vertex=None):
+    """
+    Return (counts, covering): for each graph, the number of induced paths on 4 vertices (containing vertex if it is
+    given) and the boolean matrix of the edges lying on one of them.
+    """
+    adjs = as_stack(adjs)
+    k, n, _ = adjs.shape
+    rows, columns, incidence = _quadruples(n, vertex)
+    if len(rows) == 0:
+        return np.zeros(k, dtype=np.int64), np.zeros(adjs.shape, dtype=bool)
+
+    edges = adjs[:, rows, columns]
+    degrees = edges @ incidence
+    # 4 sommets induisent un P4 s'ils portent 3 arêtes et que chaque degré induit vaut 1 ou 2 (ni étoile, ni
+    # triangle plus un sommet isolé).
+    paths = (edges.sum(axis=2) == 3) & (degrees.min(axis=2) >= 1) & (degrees.max(axis=2) <= 2)
+    counts = paths.sum(axis=1)
+
+    on_path = (edges == 1) & paths[:, :, np.newaxis]
+    slots = np.arange(k)[:, np.newaxis, np.newaxis] * n * n + rows * n + columns
+    covering = np.bincount(slots[on_path], minlength=k * n * n).reshape(k, n, n) > 0
+    return counts, covering | covering.transpose(0, 2, 1)
+
+
+def count_p4(adjs):
+    """
+    Return (counts, covered): for each graph, the number of induced paths on 4 vertices and whether every edge lies on
+    one of them.
+    """
+    counts, covering = p4_coverage(adjs)
+    return counts, (covering == (as_stack(adjs) == 1)).all(axis=(1, 2))
+
+
+def number_of_p3(adjs):
+    """
+    Return for each graph its number of induced P3, or None if some edge is not covered by one.
+    """
+    counts, covered = count_p3(adjs)
+    return [int(c) if ok else None for c, ok in zip(counts, covered)]
+
+
+def number_of_p4(adjs):
+    """
+    Return for each graph its number of induced P4, or None if some edge is not covered by one.
+    """
+    counts, covered = count_p4(adjs)
+    return [int(c) if ok else None for c, ok in zip(counts, covered)]
+
+
+def distance_matrices(adjs):
+    """
+    Return the distance matrices of the graphs, -1 marking the pairs of vertices in different components.
+    """
+    adjs = as_stack(adjs)
+    k, n, _ = adjs.shape
+    reached = np.broadcast_to(np.eye(n, dtype=bool), (k, n, n)).copy()
+    distances = np.where(reached, 0, -1)
+    # Parcours en largeur simultané depuis tous les sommets de tous les graphes : à l'étape d, les sommets atteints
+    # sont ceux à distance au plus d.
+    for d in range(1, n):
+        new = ((reached.astype(np.int64) @ adjs) > 0) & ~reached
+        if not new.any():
+            break
+        distances[new] = d
+        reached |= new
+    return distances
+
+
+def distance_invariants(adjs):
+    """
+    Return (connected, diameter, radius, wiener) arrays computed from a single distance computation per graph. The
+    diameter, radius and Wiener index (sum of the distances between all pairs of vertices) are -1 for disconnected
+    graphs.
+    """
+    return invariants_of_distances(distance_matrices(adjs))
+
+
+def invariants_of_distances(distances):
+    """
+    Same as distance_invariants, from the distance matrices given by distance_matrices.
+    """
+    connected = (distances >= 0).all(axis=(1, 2))
+    eccentricities = distances.max(axis=2)
+    diameter = np.where(connected, eccentricities.max(axis=1), -1)
+    radius = np.where(connected, eccentricities.min(axis=1), -1)
+    wiener = np.where(connected, distances.sum(axis=(1, 2)) // 2, -1)
+    return connected, diameter, radius, wiener
+
+
+def bordered(adj, neighbourhoods):
+    """
+    Return the stack of adjacency matrices of the graphs obtained by adding to the graph adj a vertex, numbered 0,
+    adjacent to the vertices set in each row of neighbourhoods, of shape (K, n). The vertices of adj are shifted by one.
+    """
+    n = len(adj)
+    neighbourhoods = np.asarray(neighbourhoods, dtype=np.int64).reshape(-1, n)
+    k = len(neighbourhoods)
+    children = np.zeros((k, n + 1, n + 1), dtype=np.int64)
+    children[:, 1:, 1:] = adj
+    children[:, 0, 1:] = neighbourhoods
+    children[:, 1:, 0] = neighbourhoods
+    return children
+
+
+def bordered_distances(distances, neighbourhoods):
+    """
+    Return the distance matrices of the graphs given by bordered(adj, neighbourhoods), from the distance matrix of the
+    connected graph adj: a shortest path either stays in adj or goes through the new vertex. The distances to the new
+    vertex are -1 when its neighbourhood is empty.
+    """
+    distances = np.asarray(distances, dtype=np.int64)
+    n = len(distances)
+    neighbourhoods = np.asarray(neighbourhoods, dtype=np.int64).reshape(-1, n)
+    k = len(neighbourhoods)
+    unreachable = n + 1
+    through = 1 + np.where(neighbourhoods[:, :, np.newaxis] == 1, distances, unreachable).min(axis=1, initial=n)
+    children = np.zeros((k, n + 1, n + 1), dtype=np.int64)
+    children[:, 1:, 1:] = np.minimum(distances, through[:, :, np.newaxis] + through[:, np.newaxis, :])
+    through = np.where(through > n, -1, through)
+    children[:, 0, 1:] = through
+    children[:, 1:, 0] = through
+    return children
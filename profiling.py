@@ -0,0 +1,193 @@
+"""
+Instrumentation des calculs, désactivée par défaut.
+
+enable() remplace les propriétés de Graph et de GraphBatch, quelques fonctions coûteuses et les connexions SQLite
+ouvertes ensuite par des versions qui cumulent leur temps d'exécution et leur nombre d'appels ; disable() remet les
+originales. Quand l'instrumentation est désactivée, le code exécuté est le code d'origine : elle ne coûte rien. Pendant
+une génération, la plupart des propriétés sont calculées par lot : elles apparaissent sous GraphBatch, un appel par lot.
+
+Les temps sont inclusifs : le temps de property_hash contient celui des propriétés qu'il lit pour la première fois.
+Les compteurs de generate.py (candidats, non connexes, isomorphes, insertions...) sont ajoutés au résumé avec watch.
+
+Depuis la ligne de commande, la variable d'environnement GRAPHS_PROFILE donne le fichier JSON où écrire les statistiques
+à la fin du programme, et GRAPHS_PROFILE_INTERVAL l'intervalle en secondes entre deux résumés affichés.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from functools import cached_property, wraps
+
+enabled = False
+timings = defaultdict(float)
+calls = Counter()
+counters = {}
+
+_patches = []
+_settings = {"interval": None, "last": 0.0}
+
+# Fonctions instrumentées en plus des propriétés de Graph : (module, nom).
+FUNCTIONS = (("canonical", "canonical_labelling"), ("canonical", "_is_canonical_extension"),
+             ("database", "get_isomorph"), ("database", "graph_to_row"), ("generate", "children_batch"))
+
+
+def record(name, seconds):
+    timings[name] += seconds
+    calls[name] += 1
+    interval = _settings["interval"]
+    if interval is not None and time.perf_counter() - _settings["last"] >= interval:
+        _settings["last"] = time.perf_counter()
+        print_summary(sys.stderr)
+
+
+def timed(name, function):
+    """
+    Return a wrapper of function recording its duration under name.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    return wrapper
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    Connexion SQLite qui chronomètre execute, executemany et commit. open_db l'utilise quand l'instrumentation est
+    activée.
+    """
+
+    def execute(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            record("sqlite.execute", time.perf_counter() - start)
+
+    def executemany(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            record("sqlite.executemany", time.perf_counter() - start)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            record("sqlite.commit", time.perf_counter() - start)
+
+
+def connection_factory():
+    return ProfiledConnection if enabled else sqlite3.Connection
+
+
+def _patch(owner, name, wrapper):
+    _patches.append((owner, name, getattr(owner, name)))
+    setattr(owner, name, wrapper)
+
+
+def _patch_function(module, name):
+    # La fonction est remplacée dans son module et dans tous les modules qui l'ont importée par son nom.
+    original = getattr(module, name)
+    wrapper = timed(f"{module.__name__}.{name}", original)
+    for m in list(sys.modules.values()):
+        for attribute, value in list(getattr(m, "__dict__", {}).items()):
+            if value is original:
+                _patch(m, attribute, wrapper)
+
+
+def enable(path=None, interval=None):
+    """
+    Start recording timings. With path, the statistics are written to this JSON file when the program exits. With
+    interval, a summary is printed on the standard error at most every interval seconds.
+    """
+    global enabled
+    if enabled:
+        return
+    from graph import Graph
+    from batch import GraphBatch
+    from database import MasterCache
+    import importlib
+
+    for cls in (Graph, GraphBatch):
+        for name, attribute in list(vars(cls).items()):
+            if isinstance(attribute, cached_property):
+                _patch(attribute, "func", timed(f"{cls.__name__}.{name}", attribute.func))
+    _patch(Graph, "__init__", timed("Graph.__init__", Graph.__init__))
+    _patch(MasterCache, "get_isomorph", timed("MasterCache.get_isomorph", MasterCache.get_isomorph))
+    for module, name in FUNCTIONS:
+        _patch_function(importlib.import_module(module), name)
+
+    _settings["interval"] = interval
+    _settings["last"] = time.perf_counter()
+    if path is not None:
+        atexit.register(write_stats, path)
+    enabled = True
+
+
+def enable_from_environment():
+    path = os.environ.get("GRAPHS_PROFILE")
+    interval = os.environ.get("GRAPHS_PROFILE_INTERVAL")
+    if path or interval:
+        enable(path or None, float(interval) if interval else None)
+
+
+def disable():
+    """
+    Stop recording timings and restore the original functions. The statistics recorded are kept.
+    """
+    global enabled
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+    _settings["interval"] = None
+    enabled = False
+
+
+def watch(name, counter):
+    """
+    Add counter, a Counter updated by the caller, to the statistics under name. Nothing is done when the
+    instrumentation is disabled.
+    """
+    if enabled:
+        counters[name] = counter
+
+
+def reset():
+    timings.clear()
+    calls.clear()
+    counters.clear()
+
+
+def summary():
+    """
+    Return the statistics as a dictionary: the calls and cumulated seconds of each instrumented function, and the
+    watched counters.
+    """
+    return {
+        "timings": {name: {"calls": calls[name], "seconds": timings[name]}
+                    for name in sorted(timings, key=timings.get, reverse=True)},
+        "counters": {name: dict(counter) for name, counter in counters.items()},
+    }
+
+
+def print_summary(file=sys.stdout):
+    stats = summary()
+    for name, timing in stats["timings"].items():
+        print(f"{name:40} {timing['calls']:10} calls {timing['seconds']:10.3f} s", file=file)
+    for name, counter in stats["counters"].items():
+        print(f"{name}: " + ", ".join(f"{key} {value}" for key, value in counter.items()), file=file)
+
+
+def write_stats(path):
+    with open(path, "w") as f:
+        json.dump(summary(), f, indent=1)
@@ -0,0 +1,152 @@
+"""
+Production des rapports de best_p3.py et best_p4.py : un chapitre LaTeX par valeur, rendu par un groupe de processus,
+compilé en PDF par des appels concurrents à pdflatex, puis les PDF des chapitres sont réunis en un seul fichier.
+
+Le fichier report_hashes.json du dossier garde l'empreinte du contenu de chaque chapitre compilé : un chapitre dont le
+contenu n'a pas changé et dont le PDF existe n'est pas recompilé. La fusion utilise pypdf s'il est installé, sinon le
+premier des programmes pdfunite, qpdf ou gs trouvé.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+from show import chapter_to_latex, chapter_header, latex_footer, write_document
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+MANIFEST = "report_hashes.json"
+
+
+def _render(args):
+    name, title, graphs = args
+    return name, chapter_to_latex(graphs, title)
+
+
+def content_hash(tex):
+    return hashlib.sha256(tex.encode()).hexdigest()
+
+
+def render_chapters(chapters, folder, workers=None):
+    """
+    chapters is a list of (name, title, graphs). Write the LaTeX chapter folder/name.tex of each of them, rendered by a
+    pool of workers processes, and return a dictionary giving the content hash of each chapter. A file whose content
+    did not change is left untouched.
+    """
+    hashes = {}
+    with Pool(workers) as pool:
+        for name, tex in pool.imap(_render, chapters):
+            hashes[name] = content_hash(tex)
+            path = os.path.join(folder, f"{name}.tex")
+            if os.path.exists(path):
+                with open(path) as f:
+                    if f.read() == tex:
+                        continue
+            with open(path, "w") as f:
+                f.write(tex)
+    return hashes
+
+
+def read_manifest(folder):
+    path = os.path.join(folder, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(folder, manifest):
+    with open(os.path.join(folder, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def compile_chapter(folder, name):
+    """
+    Compile folder/name.tex, a chapter, into folder/name.pdf with pdflatex. Return True on success.
+    """
+    wrapper = f"_{name}.tex"
+    with open(os.path.join(folder, wrapper), "w") as f:
+        f.write(chapter_header + "\\input{" + name + "}\n" + latex_footer)
+    try:
+        result = subprocess.run(["pdflatex", "-interaction=nonstopmode", "-halt-on-error", f"-jobname={name}", wrapper],
+                                cwd=folder, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    finally:
+        for extension in (".aux", ".log"):
+            path = os.path.join(folder, name + extension)
+            if os.path.exists(path):
+                os.remove(path)
+        os.remove(os.path.join(folder, wrapper))
+    return result.returncode == 0
+
+
+def compile_chapters(names, folder, workers=None):
+    """
+    Compile the chapters names concurrently, workers pdflatex at a time. Return the names of the chapters which could
+    not be compiled.
+    """
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        results = list(executor.map(lambda name: compile_chapter(folder, name), names))
+    return [name for name, ok in zip(names, results) if not ok]
+
+
+def merge_pdfs(pdfs, output):
+    """
+    Merge the PDF files pdfs, in this order, into output.
+    """
+    if pypdf is not None:
+        writer = pypdf.PdfWriter()
+        for pdf in pdfs:
+            writer.append(pdf)
+        with open(output, "wb") as f:
+            writer.write(f)
+        return
+
+    if shutil.which("pdfunite"):
+        command = ["pdfunite", *pdfs, output]
+    elif shutil.which("qpdf"):
+        command = ["qpdf", "--empty", "--pages", *pdfs, "--", output]
+    elif shutil.which("gs"):
+        command = ["gs", "-q", "-dBATCH", "-dNOPAUSE", "-sDEVICE=pdfwrite", f"-sOutputFile={output}", *pdfs]
+    else:
+        raise RuntimeError("No PDF merger found: install pypdf, pdfunite (poppler), qpdf or ghostscript")
+    subprocess.run(command, check=True)
+
+
+def build_report(chapters, folder, document, output, workers=None):
+    """
+    Write the chapters (see render_chapters) and the document folder/document including them, then, if pdflatex is
+    available, compile the chapters that changed since the last build and merge the PDF of all the chapters into
+    output.
+    """
+    os.makedirs(folder, exist_ok=True)
+    names = [name for name, _, _ in chapters]
+    hashes = render_chapters(chapters, folder, workers)
+    write_document(names, file=document, folder=folder)
+
+    if shutil.which("pdflatex") is None:
+        print("pdflatex not found: the LaTeX files are written but not compiled")
+        return
+
+    manifest = read_manifest(folder)
+    changed = [name for name in names
+               if manifest.get(name) != hashes[name] or not os.path.exists(os.path.join(folder, f"{name}.pdf"))]
+    failed = compile_chapters(changed, folder, workers)
+    for name in changed:
+        if name in failed:
+            manifest.pop(name, None)
+        else:
+            manifest[name] = hashes[name]
+    write_manifest(folder, manifest)
+    print(f"{len(changed) - len(failed)} chapters compiled, {len(names) - len(changed)} unchanged")
+    if failed:
+        print(f"pdflatex failed on: {', '.join(failed)}")
+        return
+
+    merge_pdfs([os.path.join(folder, f"{name}.pdf") for name in names], output)
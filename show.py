@@ -1,5 +1,5 @@
-from graph import Graph, GraphIsNotConnectedError
-from database import insert_graph, get_graph, open_db, close_db
+from graph import Graph, GraphIsNotConnectedError, unpack_signature
+from database import insert_graph, get_graph, open_db, close_db, SIGNATURE_COLUMNS
 import networkx as nx
 
 latex_header = """
@@ -21,14 +21,23 @@ latex_footer = """
 \\end{document}
 """
 
+# Préambule d'un chapitre compilé seul (voir report.py).
+chapter_header = """
+\\documentclass{report}
+\\usepackage{tikz}
+\\usepackage{subcaption}
+\\footnotesize
+
+\\begin{document}
+"""
+
 
 def graph_to_latex(graph):
     # display graph g using matplotlib
     tex = nx.to_latex(graph.g, as_document=False)
     tex += "\n\\begin{itemize}\n"
-    for key in graph.__dict__.keys():
-        if not key == "adj":
-            tex += f"\\item {key.replace('_', ' ')}: {graph.__dict__[key]}\n"
+    for key in ("signature", "g") + Graph.PROPERTIES + ("property_hash", "canonical_signature"):
+        tex += f"\\item {key.replace('_', ' ')}: {getattr(graph, key)}\n"
     tex += "\\end{itemize}\n"
     tex += "\\newpage\n"
 
@@ -44,14 +53,17 @@ def signature_to_latex(signature, con=None):
         graph = Graph(signature=signature, adj=None)
         insert_graph(con, graph)
     else:
-        graph = Graph(signature=row["signature"], adj=None, row=row)
+        graph = Graph(signature=unpack_signature(row["signature"]), adj=None, row=row)
 
     # display graph g using matplotlib
     tex = nx.to_latex(graph.g, as_document=False)
     with open(f"graph_{signature}.tex", "w") as f:
         tex += "\n\\begin{itemize}\n"
         for key in row.keys():
-            tex += f"\\item {key.replace('_', ' ')}: {row[key]}\n"
+            value = row[key]
+            if key in SIGNATURE_COLUMNS and value is not None:
+                value = unpack_signature(value)
+            tex += f"\\item {key.replace('_', ' ')}: {value}\n"
         tex += "\\end{itemize}\n"
 
     if con is None:
@@ -59,15 +71,19 @@ def signature_to_latex(signature, con=None):
     return tex
 
 
+def chapter_to_latex(graphs, title=None):
+    tex = ""
+    if title:
+        tex += "\\chapter{" + title + "}\n"
+        tex += "\\newpage"
+    for g in graphs:
+        tex += graph_to_latex(g)
+    return tex
+
+
 def write_graphs(graphs, name, folder="results_P3", title=None):
     with open(folder+"/"+f"{name}.tex", "w") as f:
-
-        if title:
-            f.write("\\chapter{" + title + "}\n")
-            f.write("\\newpage")
-        for g in graphs:
-            tex = graph_to_latex(g)
-            f.write(tex)
+        f.write(chapter_to_latex(graphs, title))
 
 
 
@@ -0,0 +1,46 @@
+import networkx as nx
+import numpy as np
+
+from batch import GraphBatch
+from database import pack_signature
+from graph import Graph
+
+
+def test_batch_matches_graph(masters):
+    for n, graphs in masters.items():
+        batch = GraphBatch(signatures=[pack_signature(g.signature) for g in graphs])
+        assert batch.connected.all()
+        for i, g in enumerate(graphs):
+            fresh = Graph(signature=g.signature)
+            for name in GraphBatch.FIELDS:
+                assert batch.field(name, i) == getattr(fresh, name), name
+            built = batch.graph(i)
+            assert built.signature == g.signature
+            assert built.canonical_signature == fresh.canonical_signature
+
+
+def test_batch_of_disconnected_graphs():
+    graphs = [nx.empty_graph(4), nx.disjoint_union(nx.path_graph(2), nx.cycle_graph(3)), nx.path_graph(5)]
+    adjs = [nx.to_numpy_array(h, dtype=int) for h in graphs]
+    batch = GraphBatch(adjs=np.array([np.pad(a, (0, 5 - len(a))) for a in adjs]))
+    assert batch.connected.tolist() == [False, False, True]
+    assert batch.diameter.tolist()[:2] == [-1, -1]
+    assert batch.field("diameter", 2) == 4
+
+
+def test_extensions_match_graph(masters):
+    # Les propriétés dérivées du parent sont celles que Graph calcule sur le graphe fils.
+    for n, graphs in masters.items():
+        if n > 5:
+            continue
+        for parent in graphs:
+            neighbourhoods = (np.arange(1 << n)[:, np.newaxis] >> np.arange(n)) & 1
+            batch = GraphBatch.extensions(parent, neighbourhoods)
+            fresh_batch = GraphBatch(adjs=batch.adjs)
+            assert (batch.distances == fresh_batch.distances).all()
+            for name in ("degrees", "size", "number_of_triangles", "p3", "p4"):
+                assert batch.field(name, 0) == fresh_batch.field(name, 0), name
+            for i in range(1, len(batch)):
+                fresh = Graph(adj=batch.adjs[i])
+                for name in GraphBatch.FIELDS:
+                    assert batch.field(name, i) == getattr(fresh, name), name
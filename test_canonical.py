@@ -0,0 +1,26 @@
+import random
+
+import networkx as nx
+import numpy as np
+
+from canonical import canonical_signature
+
+
+def test_canonical_signature_is_invariant_under_relabelling():
+    rng = random.Random(0)
+    for _ in range(300):
+        n = rng.randint(2, 9)
+        g = nx.gnp_random_graph(n, rng.uniform(0.1, 0.9), seed=rng.randrange(1 << 30))
+        adj = nx.to_numpy_array(g, dtype=int)
+        p = rng.sample(range(n), n)
+        assert canonical_signature(adj) == canonical_signature(adj[np.ix_(p, p)])
+
+
+def test_canonical_signature_separates_non_isomorphic_graphs():
+    rng = random.Random(1)
+    for _ in range(300):
+        n = rng.randint(4, 7)
+        a = nx.gnp_random_graph(n, 0.5, seed=rng.randrange(1 << 30))
+        b = nx.gnp_random_graph(n, 0.5, seed=rng.randrange(1 << 30))
+        signatures = [canonical_signature(nx.to_numpy_array(h, dtype=int)) for h in (a, b)]
+        assert (signatures[0] == signatures[1]) == nx.is_isomorphic(a, b)
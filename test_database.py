@@ -0,0 +1,180 @@
+import sqlite3
+import threading
+
+import pytest
+
+from conftest import generate
+from database import open_db, close_db, pack_signature, insert_graph, index_masters, graph_to_row, get_isomorph, \
+    RowWriter
+from generate import extend_db_with_one_node, nb_of_graphs
+from graph import Graph
+
+# Table graphs des bases écrites avant le passage aux signatures entières et l'ajout des signatures canoniques.
+BASELINE_GRAPHS_TABLE = """CREATE TABLE graphs (
+                         signature TEXT NOT NULL PRIMARY KEY,
+                         property_hash TEXT NOT NULL,
+                         graph_order INTEGER,
+                         graph_size INTEGER,
+                         isomorph TEXT,
+                         max_degree INTEGER,
+                         degrees TEXT,
+                         is_tree BOOLEAN,
+                         is_bipartite BOOLEAN,
+                         has_bridge BOOLEAN,
+                         is_chordal BOOLEAN,
+                         is_complete BOOLEAN,
+                         min_cycle_basis_weight INTEGER,
+                         min_cycle_basis_size INTEGER,
+                         diameter INTEGER,
+                         radius INTEGER,
+                         is_eulerian BOOLEAN,
+                         is_planar BOOLEAN,
+                         number_of_faces INTEGER,
+                         is_regular BOOLEAN,
+                         p3 INTEGER,
+                         p4 INTEGER,
+                         FOREIGN KEY(isomorph) REFERENCES graphs(signature)
+)"""
+
+
+def test_masters_keep_the_smallest_signature(tmp_path):
+    # Deux masters isomorphes (chemins sur 3 sommets), insérés dans les deux ordres.
+    for signatures in (("110", "011"), ("011", "110")):
+        con = open_db(str(tmp_path / f"{signatures[0]}.db"))
+        try:
+            for s in signatures:
+                insert_graph(con, Graph(signature=s), isomorph=s)
+            incremental = con.execute("SELECT * FROM masters").fetchall()
+            index_masters(con)
+            assert con.execute("SELECT * FROM masters").fetchall() == incremental
+            assert [tuple(row) for row in incremental] == [(pack_signature(Graph(signature="011").canonical_signature),
+                                                            pack_signature("011"))]
+        finally:
+            close_db(con)
+
+
+def test_missing_canonical_signatures_are_computed_on_open(tmp_path, monkeypatch):
+    # Base écrite avant l'ajout des signatures canoniques : ni signature canonique, ni masters, ni aliases.
+    path = generate(tmp_path, False, max_order=6)
+    con = sqlite3.connect(path)
+    con.execute("UPDATE graphs SET canonical_signature = NULL")
+    con.execute("DROP TABLE masters")
+    con.execute("DROP TABLE aliases")
+    con.execute("DELETE FROM extended")
+    con.commit()
+    con.close()
+
+    con = open_db(path)
+    try:
+        assert con.execute("SELECT count(*) FROM graphs WHERE canonical_signature IS NULL").fetchone()[0] == 0
+        assert con.execute("SELECT count(*) FROM masters").fetchone()[0] == sum(nb_of_graphs[2:7])
+    finally:
+        close_db(con)
+
+    # Les graphes d'ordre 6 sont tous retrouvés : aucun nouveau master.
+    monkeypatch.chdir(tmp_path)
+    extend_db_with_one_node(5)
+    con = open_db(path)
+    try:
+        masters = con.execute("SELECT count(*) FROM graphs WHERE graph_order = 6 and isomorph = signature").fetchone()[0]
+        assert masters == nb_of_graphs[6]
+    finally:
+        close_db(con)
+
+
+def test_baseline_database_is_packed_and_indexed(tmp_path):
+    # K2, le chemin P3 sous ses trois numérotations (011 est le master) et K3, stockés comme avant : signatures en
+    # texte, sans signature canonique.
+    isomorphs = {"1": "1", "011": "011", "101": "011", "110": "011", "111": "111"}
+    path = str(tmp_path / "graphs.db")
+    con = sqlite3.connect(path)
+    con.execute(BASELINE_GRAPHS_TABLE)
+    for s, isomorph in isomorphs.items():
+        row = graph_to_row(Graph(signature=s), isomorph=isomorph)
+        del row["canonical_signature"]
+        row.update(signature=s, isomorph=isomorph)
+        con.execute(f"INSERT INTO graphs ({', '.join(row)}) VALUES ({', '.join(':' + c for c in row)})", row)
+    con.commit()
+    con.close()
+
+    con = open_db(path)
+    try:
+        rows = con.execute("SELECT signature, isomorph, canonical_signature FROM graphs ORDER BY signature").fetchall()
+        assert [tuple(row) for row in rows] == sorted(
+            (pack_signature(s), pack_signature(isomorph), pack_signature(Graph(signature=s).canonical_signature))
+            for s, isomorph in isomorphs.items())
+        masters = con.execute("SELECT canonical_signature, signature FROM masters").fetchall()
+        assert sorted(tuple(row) for row in masters) == sorted(
+            (pack_signature(Graph(signature=s).canonical_signature), pack_signature(s)) for s in ("1", "011", "111"))
+        aliases = con.execute("SELECT signature, master FROM aliases").fetchall()
+        assert sorted(tuple(row) for row in aliases) == [(pack_signature("101"), pack_signature("011")),
+                                                         (pack_signature("110"), pack_signature("011"))]
+        assert get_isomorph(con, Graph(signature="110")) == "011"
+    finally:
+        close_db(con)
+
+
+def rows_of(*signatures):
+    return [graph_to_row(Graph(signature=s), isomorph=s) for s in signatures]
+
+
+def stored(path):
+    con = open_db(path)
+    try:
+        graphs = [row[0] for row in con.execute("SELECT signature FROM graphs ORDER BY signature")]
+        extended = [row[0] for row in con.execute("SELECT parent FROM extended ORDER BY parent")]
+        return graphs, extended
+    finally:
+        close_db(con)
+
+
+@pytest.mark.parametrize("error", [ValueError, KeyboardInterrupt])
+def test_writer_commits_on_error(tmp_path, error):
+    path = str(tmp_path / "graphs.db")
+    close_db(open_db(path))
+    with pytest.raises(error):
+        with RowWriter(path) as writer:
+            writer.put("1", rows_of("011", "111"))
+            raise error()
+    assert stored(path) == ([pack_signature("011"), pack_signature("111")], [pack_signature("1")])
+    assert writer.pending == {}
+
+
+def test_writer_put_waits_for_commit(tmp_path):
+    # Les validations du writer sont retenues : au-delà de batch_size lignes non validées, put attend.
+    path = str(tmp_path / "graphs.db")
+    close_db(open_db(path))
+    release = threading.Event()
+
+    class GatedWriter(RowWriter):
+        def _commit(self, con, rows):
+            release.wait()
+            super()._commit(con, rows)
+
+    with GatedWriter(path, batch_size=2) as writer:
+        writer.put(None, rows_of("011", "111"))
+        blocked = threading.Thread(target=writer.put, args=(None, rows_of("110")))
+        blocked.start()
+        blocked.join(timeout=0.5)
+        assert blocked.is_alive()
+        release.set()
+        blocked.join(timeout=5)
+        assert not blocked.is_alive()
+    assert len(stored(path)[0]) == 3
+
+
+def test_writer_error_is_raised(tmp_path):
+    path = str(tmp_path / "graphs.db")
+    close_db(open_db(path))
+    # Une ligne sans property_hash (colonne NOT NULL) fait échouer l'insertion dans le thread du writer.
+    row = rows_of("011")[0]
+    row["property_hash"] = None
+    writer = RowWriter(path)
+    writer.put(None, [row])
+    writer.thread.join(timeout=5)
+    with pytest.raises(RuntimeError) as info:
+        writer.put(None, rows_of("111"))
+    assert isinstance(info.value.__cause__, sqlite3.IntegrityError)
+    with pytest.raises(RuntimeError) as info:
+        writer.close()
+    assert isinstance(info.value.__cause__, sqlite3.IntegrityError)
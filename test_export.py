@@ -0,0 +1,19 @@
+import export
+from database import open_db, close_db
+from generate import extend_db_with_one_node, nb_of_graphs
+
+
+def test_export_with_full_last_chunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for n in range(1, 5):
+        extend_db_with_one_node(n)
+    # 21 graphs d'ordre 5 : le dernier bloc lu est plein.
+    monkeypatch.setattr(export, "CHUNK_SIZE", nb_of_graphs[5])
+    con = open_db()
+    try:
+        assert export.export_db(con, "snapshot", orders=range(2, 6)) == {n: nb_of_graphs[n] for n in range(2, 6)}
+    finally:
+        close_db(con)
+    snapshot = export.open_snapshot("snapshot")
+    assert len(snapshot[5]["signature"]) == nb_of_graphs[5]
+    assert (snapshot[5]["signature"] > 0).all()
@@ -0,0 +1,154 @@
+import threading
+
+import pytest
+
+import generate
+from conftest import MAX_ORDER, generate as generate_up_to
+from database import open_db, close_db, iterate_over_graphs_of_order, RowWriter
+from generate import extend_db_with_one_node, enumerate_all_signature, known_fingerprints, nb_of_graphs, \
+    extend_db_with_one_node_in_parallel
+
+
+def test_generation_counts(masters, exhaustive_masters):
+    for n in range(2, MAX_ORDER + 1):
+        assert len(masters[n]) == nb_of_graphs[n]
+        canonical = {g.canonical_signature for g in masters[n]}
+        assert len(canonical) == nb_of_graphs[n]
+        assert canonical == {g.canonical_signature for g in exhaustive_masters[n]}
+
+
+def test_enumeration_again_inserts_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for n in range(1, 5):
+        extend_db_with_one_node(n)
+    stats = enumerate_all_signature(orders=(4, 5))
+    assert stats["inserted"] == 0
+    con = open_db()
+    try:
+        masters = con.execute("SELECT COUNT(*) FROM graphs WHERE isomorph = signature").fetchone()[0]
+        assert masters == sum(nb_of_graphs[2:6])
+        assert con.execute("SELECT COUNT(*) FROM masters").fetchone()[0] == masters
+    finally:
+        close_db(con)
+
+
+def test_known_fingerprints(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for n in range(1, 6):
+        extend_db_with_one_node(n)
+    con = open_db()
+    try:
+        expected = {(g.degrees, g.number_of_triangles) for g in iterate_over_graphs_of_order(con, 6, masters=True)}
+        assert known_fingerprints(con, 6) == expected
+    finally:
+        close_db(con)
+
+
+def count_masters(path, n):
+    con = open_db(path)
+    try:
+        return con.execute("SELECT COUNT(*) FROM graphs WHERE graph_order = ? and isomorph = signature",
+                           (n,)).fetchone()[0]
+    finally:
+        close_db(con)
+
+
+def test_parallel_commit_between_pending_and_database(tmp_path, monkeypatch):
+    # Le writer valide ses lignes exactement entre la lecture de la base et la fin du dédoublonnage d'une tranche :
+    # les masters de la tranche précédente quittent pending sans avoir été vus dans la base par cette lecture.
+    monkeypatch.chdir(tmp_path)
+    for n in range(1, 4):
+        extend_db_with_one_node(n)
+    release = threading.Event()
+    writers = []
+
+    class GatedWriter(RowWriter):
+        def __init__(self, path):
+            super().__init__(path, batch_size=1)
+            writers.append(self)
+
+        def _commit(self, con, rows):
+            release.wait()
+            super()._commit(con, rows)
+
+        def close(self):
+            release.set()
+            return super().close()
+
+    def get_known_then_commit(con, canonical_signatures):
+        known = get_known_canonical_signatures(con, canonical_signatures)
+        writer = writers[0]
+        release.set()
+        with writer.condition:
+            writer.condition.wait_for(lambda: writer.uncommitted == 0)
+        release.clear()
+        return known
+
+    get_known_canonical_signatures = generate.get_known_canonical_signatures
+    monkeypatch.setattr(generate, "RowWriter", GatedWriter)
+    monkeypatch.setattr(generate, "get_known_canonical_signatures", get_known_then_commit)
+    extend_db_with_one_node_in_parallel(4, workers=1, canonical_augmentation=False, shard_size=1)
+    assert count_masters("graphs.db", 5) == nb_of_graphs[5]
+
+
+def test_parallel_output_does_not_depend_on_workers(tmp_path, monkeypatch):
+    for canonical_augmentation in (True, False):
+        tables = []
+        for workers in (1, 3):
+            folder = tmp_path / f"{canonical_augmentation}-{workers}"
+            folder.mkdir()
+            monkeypatch.chdir(folder)
+            for n in range(1, 3):
+                extend_db_with_one_node(n)
+            for n in range(3, 6):
+                extend_db_with_one_node_in_parallel(n, workers, canonical_augmentation, shard_size=4)
+            for n in range(2, 7):
+                assert count_masters("graphs.db", n) == nb_of_graphs[n]
+            con = open_db()
+            try:
+                tables.append([tuple(row) for row in con.execute("SELECT * FROM graphs ORDER BY signature")])
+            finally:
+                close_db(con)
+        assert tables[0] == tables[1]
+
+
+@pytest.mark.parametrize("canonical_augmentation", [True, False])
+def test_interrupted_generation_resumes(tmp_path, monkeypatch, canonical_augmentation):
+    generate_up_to(tmp_path, canonical_augmentation, max_order=5)
+    monkeypatch.chdir(tmp_path)
+    children_batch = generate.children_batch
+    parents = []
+
+    def interrupted_children_batch(parent, neighbourhoods):
+        if len(parents) == 9:
+            raise KeyboardInterrupt()
+        parents.append(parent.signature)
+        return children_batch(parent, neighbourhoods)
+
+    monkeypatch.setattr(generate, "children_batch", interrupted_children_batch)
+    with pytest.raises(KeyboardInterrupt):
+        extend_db_with_one_node(5, canonical_augmentation)
+    con = open_db()
+    try:
+        assert con.execute("SELECT COUNT(*) FROM extended WHERE parent IN (SELECT signature FROM graphs "
+                           "WHERE graph_order = 5)").fetchone()[0] == 9
+    finally:
+        close_db(con)
+
+    # La reprise ne construit que les fils des parents qui n'ont pas été étendus.
+    resumed = []
+
+    def counted_children_batch(parent, neighbourhoods):
+        resumed.append(parent.signature)
+        return children_batch(parent, neighbourhoods)
+
+    monkeypatch.setattr(generate, "children_batch", counted_children_batch)
+    extend_db_with_one_node(5, canonical_augmentation)
+    assert len(resumed) == nb_of_graphs[5] - 9
+    assert not set(resumed) & set(parents)
+    con = open_db()
+    try:
+        rows = con.execute("SELECT COUNT(*), SUM(isomorph = signature) FROM graphs WHERE graph_order = 6").fetchone()
+        assert tuple(rows) == (nb_of_graphs[6], nb_of_graphs[6])
+    finally:
+        close_db(con)
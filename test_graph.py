@@ -0,0 +1,57 @@
+import random
+
+import networkx as nx
+import pytest
+
+import bitgraph
+from canonical import rows_from_matrix
+from graph import Graph, GraphIsNotConnectedError
+
+
+def test_bitmask_properties_match_networkx(all_masters):
+    for g in all_masters:
+        fresh = Graph(signature=g.signature)
+        h = nx.from_numpy_array(g.adj)
+        assert fresh.diameter == nx.diameter(h)
+        assert fresh.radius == nx.radius(h)
+        assert fresh.is_bipartite == nx.is_bipartite(h)
+        assert fresh.is_tree == nx.is_tree(h)
+        assert fresh.has_bridge == nx.has_bridges(h)
+        assert fresh.is_eulerian == nx.is_eulerian(h)
+        assert fresh.is_regular == nx.is_regular(h)
+        assert fresh.max_degree == max(d for _, d in h.degree)
+
+
+def test_stored_properties_match_networkx(all_masters):
+    for g in all_masters:
+        h = nx.from_numpy_array(g.adj)
+        assert g.diameter == nx.diameter(h)
+        assert g.radius == nx.radius(h)
+        assert g.is_bipartite == nx.is_bipartite(h)
+        assert g.is_tree == nx.is_tree(h)
+        assert g.has_bridge == nx.has_bridges(h)
+        assert g.is_eulerian == nx.is_eulerian(h)
+        assert g.is_regular == nx.is_regular(h)
+
+
+def test_connectivity_matches_networkx():
+    rng = random.Random(2)
+    for _ in range(300):
+        n = rng.randint(2, 9)
+        h = nx.gnp_random_graph(n, rng.uniform(0.1, 0.6), seed=rng.randrange(1 << 30))
+        adj = nx.to_numpy_array(h, dtype=int)
+        assert bitgraph.is_connected(rows_from_matrix(adj)) == nx.is_connected(h)
+        if not nx.is_connected(h):
+            with pytest.raises(GraphIsNotConnectedError):
+                Graph(adj=adj)
+
+
+def test_minimum_cycle_basis_and_planarity_match_networkx(all_masters):
+    for g in all_masters:
+        h = nx.from_numpy_array(g.adj)
+        fresh = Graph(signature=g.signature)
+        assert fresh.min_cycle_basis_weight == sum(len(c) for c in nx.minimum_cycle_basis(h))
+        assert fresh.min_cycle_basis_size == len(nx.minimum_cycle_basis(h))
+        assert fresh.is_planar == nx.is_planar(h)
+        assert (g.min_cycle_basis_weight, g.min_cycle_basis_size, g.is_planar) == \
+            (fresh.min_cycle_basis_weight, fresh.min_cycle_basis_size, fresh.is_planar)
@@ -0,0 +1,59 @@
+import random
+from itertools import combinations
+
+import networkx as nx
+import numpy as np
+
+import kernels
+
+
+def induced_paths(h, k):
+    # Décompte direct : les ensembles de k sommets qui induisent un chemin, et les arêtes couvertes par l'un d'eux.
+    path = nx.path_graph(k)
+    count = 0
+    covered = set()
+    for vertices in combinations(h.nodes, k):
+        sub = h.subgraph(vertices)
+        if sub.number_of_edges() == k - 1 and nx.is_isomorphic(sub, path):
+            count += 1
+            covered.update(frozenset(e) for e in sub.edges)
+    return count if covered == {frozenset(e) for e in h.edges} else None
+
+
+def test_p3_p4_match_direct_count(masters):
+    for n, graphs in masters.items():
+        adjs = np.array([g.adj for g in graphs])
+        p3, p4 = kernels.number_of_p3(adjs), kernels.number_of_p4(adjs)
+        for i, g in enumerate(graphs):
+            h = nx.from_numpy_array(g.adj)
+            assert p3[i] == g.p3 == induced_paths(h, 3)
+            assert p4[i] == g.p4 == induced_paths(h, 4)
+
+
+def test_distance_invariants_match_networkx():
+    rng = random.Random(3)
+    for n in range(2, 9):
+        graphs = [nx.gnp_random_graph(n, rng.uniform(0.1, 0.7), seed=rng.randrange(1 << 30)) for _ in range(50)]
+        adjs = np.array([nx.to_numpy_array(h, dtype=int) for h in graphs])
+        connected, diameter, radius, wiener = kernels.distance_invariants(adjs)
+        for i, h in enumerate(graphs):
+            assert connected[i] == nx.is_connected(h)
+            if connected[i]:
+                assert (diameter[i], radius[i], wiener[i]) == (nx.diameter(h), nx.radius(h), nx.wiener_index(h))
+            else:
+                assert (diameter[i], radius[i], wiener[i]) == (-1, -1, -1)
+
+
+def test_stored_wiener_index(all_masters):
+    for g in all_masters:
+        assert g.wiener_index == nx.wiener_index(nx.from_numpy_array(g.adj))
+
+
+def test_triangles(all_masters):
+    by_order = {}
+    for g in all_masters:
+        by_order.setdefault(g.order, []).append(g)
+    for graphs in by_order.values():
+        triangles = kernels.count_triangles(np.array([g.adj for g in graphs]))
+        for g, t in zip(graphs, triangles):
+            assert t == g.number_of_triangles == sum(nx.triangles(nx.from_numpy_array(g.adj)).values()) // 3